@@ -0,0 +1,192 @@
+import os
+import re
+import json
+from pathlib import Path
+from collections import Counter
+
+import numpy as np
+
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+
+# Constants
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+KEYWORD_INDEX_FILE = "keyword_index.npz"
+KEYWORD_VOCAB_FILE = "keyword_vocab.json"
+
+# Keeps technical tokens whole: gpt-4, resnet50, l2_norm, v1.5
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index over node texts with Okapi BM25 scoring
+
+    Postings are stored as flat arrays (node rows and term frequencies)
+    grouped by term, with one offset per term; a query scores only the
+    postings of its terms, with no embedding call involved.
+    """
+
+    def __init__(self, node_ids, vocab, offsets, post_rows, post_tfs, doc_lens):
+        self.node_ids = list(node_ids)
+        self.vocab = vocab  # term -> position in offsets
+        self.offsets = offsets
+        self.post_rows = post_rows
+        self.post_tfs = post_tfs
+        self.doc_lens = doc_lens
+        self.avg_len = float(doc_lens.mean()) if len(doc_lens) else 0.0
+
+    @classmethod
+    def build(cls, nodes) -> "BM25Index":
+        """Index (node_id, text) pairs"""
+        node_ids, doc_lens, postings = [], [], {}
+        for row, (node_id, text) in enumerate(nodes):
+            counts = Counter(tokenize(text))
+            node_ids.append(node_id)
+            doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        vocab, offsets, rows, tfs = {}, [0], [], []
+        for term, entries in postings.items():
+            vocab[term] = len(vocab)
+            rows.extend(row for row, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+            offsets.append(len(rows))
+        return cls(node_ids, vocab, np.array(offsets, dtype=np.int64), np.array(rows, dtype=np.int32),
+                   np.array(tfs, dtype=np.float32), np.array(doc_lens, dtype=np.float32))
+
+    def update(self, removed, nodes) -> "BM25Index":
+        """
+        Copy without the removed node ids and with (node_id, text) pairs added
+
+        Only the added texts are tokenized; the postings of the other nodes
+        are filtered and renumbered as arrays.
+        """
+        removed = set(removed)
+        keep = np.array([node_id not in removed for node_id in self.node_ids], dtype=bool)
+        new_rows = np.cumsum(keep) - 1
+        post_terms = np.repeat(np.arange(len(self.vocab)), np.diff(self.offsets))
+        kept = keep[self.post_rows]
+        terms, rows, tfs = [post_terms[kept]], [new_rows[self.post_rows[kept]]], [self.post_tfs[kept]]
+
+        vocab = dict(self.vocab)
+        node_ids = [node_id for node_id, k in zip(self.node_ids, keep) if k]
+        doc_lens = list(self.doc_lens[keep])
+        added_terms, added_rows, added_tfs = [], [], []
+        for node_id, text in nodes:
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                added_terms.append(vocab.setdefault(term, len(vocab)))
+                added_rows.append(len(node_ids))
+                added_tfs.append(tf)
+            node_ids.append(node_id)
+            doc_lens.append(sum(counts.values()))
+        terms.append(np.array(added_terms, dtype=np.int64))
+        rows.append(np.array(added_rows, dtype=np.int64))
+        tfs.append(np.array(added_tfs, dtype=np.float32))
+
+        terms, rows, tfs = np.concatenate(terms), np.concatenate(rows), np.concatenate(tfs)
+        # Regroup by term, dropping terms whose postings all went away
+        counts = np.bincount(terms, minlength=len(vocab))
+        positions = np.cumsum(counts > 0) - 1
+        vocab = {term: int(positions[i]) for term, i in vocab.items() if counts[i]}
+        order = np.argsort(terms, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(counts[counts > 0])])
+        return type(self)(node_ids, vocab, offsets.astype(np.int64), rows[order].astype(np.int32),
+                          tfs[order], np.array(doc_lens, dtype=np.float32))
+
+    def persist(self, persist_dir):
+        persist_dir = Path(persist_dir)
+        tmp_path = persist_dir / (KEYWORD_INDEX_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, offsets=self.offsets, post_rows=self.post_rows, post_tfs=self.post_tfs, doc_lens=self.doc_lens)
+        os.replace(tmp_path, persist_dir / KEYWORD_INDEX_FILE)
+        tmp_path = persist_dir / (KEYWORD_VOCAB_FILE + ".tmp")
+        tmp_path.write_text(json.dumps({'node_ids': self.node_ids, 'vocab': self.vocab}))
+        os.replace(tmp_path, persist_dir / KEYWORD_VOCAB_FILE)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir):
+        """Persisted index, or None if there is none"""
+        persist_dir = Path(persist_dir)
+        try:
+            table = json.loads((persist_dir / KEYWORD_VOCAB_FILE).read_text())
+            arrays = np.load(persist_dir / KEYWORD_INDEX_FILE)
+        except (OSError, ValueError):
+            return None
+        return cls(table['node_ids'], table['vocab'], arrays['offsets'], arrays['post_rows'],
+                   arrays['post_tfs'], arrays['doc_lens'])
+
+    def search(self, query: str, top_k: int) -> list:
+        """(node_id, score) pairs for the best matching nodes, best first"""
+        n = len(self.node_ids)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            position = self.vocab.get(term)
+            if position is None:
+                continue
+            start, end = self.offsets[position], self.offsets[position + 1]
+            rows, tfs = self.post_rows[start:end], self.post_tfs[start:end]
+            df = end - start
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_lens[rows] / self.avg_len)
+            scores[rows] += idf * tfs * (BM25_K1 + 1.0) / (tfs + norm)
+
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        k = min(top_k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.node_ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K) -> list:
+    """Fuse ranked id lists: score(id) = sum of 1 / (k + rank), best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking):
+            scores[node_id] = scores.get(node_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves with BM25, vectors, or both fused by reciprocal rank
+
+    mode is "keyword", "vector" or "hybrid". Keyword mode never embeds the
+    query. Hybrid mode takes a deeper candidate list from each side before
+    fusing down to top_k.
+    """
+
+    def __init__(self, index, keyword_index: BM25Index, mode: str = "hybrid", top_k: int = 2, **kwargs):
+        super().__init__(**kwargs)
+        self._index = index
+        self._keyword_index = keyword_index
+        self._mode = mode if keyword_index is not None else "vector"
+        self._top_k = top_k
+
+    def _keyword_nodes(self, query: str, top_k: int) -> list:
+        hits = self._keyword_index.search(query, top_k)
+        nodes = self._index.docstore.get_nodes([node_id for node_id, _ in hits])
+        return [NodeWithScore(node=node, score=score) for node, (_, score) in zip(nodes, hits)]
+
+    def _retrieve(self, query_bundle) -> list:
+        if self._mode == "keyword":
+            return self._keyword_nodes(query_bundle.query_str, self._top_k)
+        if self._mode == "vector":
+            return self._index.as_retriever(similarity_top_k=self._top_k).retrieve(query_bundle)
+
+        depth = self._top_k * 4
+        keyword = self._keyword_nodes(query_bundle.query_str, depth)
+        vector = self._index.as_retriever(similarity_top_k=depth).retrieve(query_bundle)
+        nodes = {hit.node.node_id: hit.node for hit in keyword + vector}
+        fused = reciprocal_rank_fusion([[hit.node.node_id for hit in keyword], [hit.node.node_id for hit in vector]])
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in fused[:self._top_k]]
@@ -0,0 +1,133 @@
+import os
+import time
+import pickle
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# Constants
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(6 * 3600)))  # seconds
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")  # empty disables the disk tier
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "4096"))
+
+
+def hash_key(*parts) -> str:
+    """Stable hex digest for a tuple of key parts"""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry expiry and an optional disk tier
+
+    Keys are strings. The memory tier evicts the least recently used entry
+    once max_entries is reached; the disk tier keeps one pickle file per key
+    and drops the oldest files beyond disk_max_entries.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, disk_dir=None,
+                 disk_max_entries: int = RESULT_CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.pkl"
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    expires_at, value = pickle.load(f)
+            except (OSError, pickle.PickleError, EOFError):
+                return None
+            if expires_at > now:
+                self._remember(key, value, expires_at)
+                return value
+            path.unlink(missing_ok=True)
+        return None
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((expires_at, value), f)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk_dir:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self):
+        files = list(self.disk_dir.glob('*.pkl'))
+        if len(files) <= self.disk_max_entries:
+            return
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for path in files[:len(files) - self.disk_max_entries]:
+            path.unlink(missing_ok=True)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one running coroutine"""
+
+    def __init__(self):
+        self._calls = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn):
+        """Await fn() once per key; callers arriving meanwhile share its result"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield so one disconnecting client does not cancel the shared run
+        return await asyncio.shield(task)
+
+
+result_cache = TTLCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL, RESULT_CACHE_DIR or None)
+result_flights = SingleFlight()
@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+# Constants
+CATALOG_DB_PATH = Path(os.getenv("ARXIV_CATALOG_PATH", "data/catalog.db"))
+QUERY_CACHE_TTL = int(os.getenv("ARXIV_QUERY_TTL", str(24 * 3600)))  # seconds
+
+PAPER_FIELDS = ['arxiv_id', 'title', 'authors', 'abstract', 'categories', 'published',
+                'pdf_url', 'filename', 'local_path', 'sha256', 'updated_at']
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+def paper_record(result) -> dict:
+    """Catalog record for an arxiv.Result"""
+    return {
+        'arxiv_id': result.get_short_id(),
+        'title': result.title,
+        'authors': [str(author) for author in result.authors],
+        'abstract': result.summary,
+        'categories': list(result.categories),
+        'published': result.published.isoformat() if result.published else None,
+        'pdf_url': result.pdf_url,
+    }
+
+
+class PaperCatalog:
+    """
+    Local SQLite catalog of arXiv paper metadata
+
+    Every search result is stored with its metadata and, once downloaded,
+    its local file and hash. Query results are cached with a TTL, and an
+    FTS5 index over titles and abstracts answers offline searches.
+    """
+
+    def __init__(self, db_path: Path = CATALOG_DB_PATH, query_ttl: int = QUERY_CACHE_TTL):
+        self.query_ttl = query_ttl
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS papers ("
+                " arxiv_id TEXT PRIMARY KEY, title TEXT, authors TEXT, abstract TEXT,"
+                " categories TEXT, published TEXT, pdf_url TEXT, filename TEXT,"
+                " local_path TEXT, sha256 TEXT, updated_at REAL);"
+                "CREATE TABLE IF NOT EXISTS queries ("
+                " query TEXT NOT NULL, max_results INTEGER NOT NULL, arxiv_ids TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL, PRIMARY KEY (query, max_results));"
+            )
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+                    "arxiv_id UNINDEXED, title, abstract)"
+                )
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: fall back to LIKE matching
+                self.has_fts = False
+            self._conn.commit()
+
+    def upsert(self, records):
+        """Insert or update paper metadata, keeping download details already known"""
+        now = time.time()
+        with self._lock:
+            for record in records:
+                self._conn.execute(
+                    "INSERT INTO papers (arxiv_id, title, authors, abstract, categories, published, pdf_url, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(arxiv_id) DO UPDATE SET title = excluded.title, authors = excluded.authors,"
+                    " abstract = excluded.abstract, categories = excluded.categories,"
+                    " published = excluded.published, pdf_url = excluded.pdf_url, updated_at = excluded.updated_at",
+                    (record['arxiv_id'], record['title'], json.dumps(record['authors']), record['abstract'],
+                     json.dumps(record['categories']), record['published'], record['pdf_url'], now)
+                )
+                if self.has_fts:
+                    self._conn.execute("DELETE FROM papers_fts WHERE arxiv_id = ?", (record['arxiv_id'],))
+                    self._conn.execute(
+                        "INSERT INTO papers_fts (arxiv_id, title, abstract) VALUES (?, ?, ?)",
+                        (record['arxiv_id'], record['title'], record['abstract'])
+                    )
+            self._conn.commit()
+
+    def set_download(self, arxiv_id: str, filename: str, local_path: str, sha256: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE papers SET filename = ?, local_path = ?, sha256 = ?, updated_at = ? WHERE arxiv_id = ?",
+                (filename, local_path, sha256, time.time(), arxiv_id)
+            )
+            self._conn.commit()
+
+    def get(self, arxiv_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM papers WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_many(self, arxiv_ids) -> list:
+        """Records for the ids that are in the catalog, in the order given"""
+        found = {}
+        with self._lock:
+            for arxiv_id in arxiv_ids:
+                row = self._conn.execute("SELECT * FROM papers WHERE arxiv_id = ?", (arxiv_id,)).fetchone()
+                if row:
+                    found[arxiv_id] = self._to_dict(row)
+        return [found[arxiv_id] for arxiv_id in arxiv_ids if arxiv_id in found]
+
+    def record_query(self, query: str, max_results: int, arxiv_ids):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO queries (query, max_results, arxiv_ids, fetched_at) VALUES (?, ?, ?, ?)",
+                (normalize_query(query), max_results, json.dumps(list(arxiv_ids)), time.time())
+            )
+            self._conn.commit()
+
+    def cached_query(self, query: str, max_results: int):
+        """Records from a previous identical search still within its TTL, else None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT arxiv_ids, fetched_at FROM queries WHERE query = ? AND max_results = ?",
+                (normalize_query(query), max_results)
+            ).fetchone()
+        if row is None or time.time() - row['fetched_at'] > self.query_ttl:
+            return None
+        arxiv_ids = json.loads(row['arxiv_ids'])
+        records = self.get_many(arxiv_ids)
+        return records if len(records) == len(arxiv_ids) else None
+
+    def search(self, text: str, limit: int = 20) -> list:
+        """Full-text search over titles and abstracts, best matches first"""
+        terms = re.findall(r"\w+", text)
+        if not terms:
+            return []
+        with self._lock:
+            if self.has_fts:
+                match = " OR ".join(f'"{term}"' for term in terms)
+                rows = self._conn.execute(
+                    "SELECT papers.* FROM papers_fts JOIN papers USING (arxiv_id)"
+                    " WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts) LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+            else:
+                clauses = " OR ".join("(title LIKE ? OR abstract LIKE ?)" for _ in terms)
+                params = [p for term in terms for p in (f"%{term}%", f"%{term}%")]
+                rows = self._conn.execute(
+                    f"SELECT * FROM papers WHERE {clauses} LIMIT ?", params + [limit]
+                ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        record = {field: row[field] for field in PAPER_FIELDS}
+        record['authors'] = json.loads(record['authors'] or "[]")
+        record['categories'] = json.loads(record['categories'] or "[]")
+        return record
+
+
+paper_catalog = PaperCatalog()
@@ -1,6 +1,8 @@
 
 import os
 import yaml
+import hashlib
+import threading
 from crewai import Agent, Task, Crew, Process
 from dotenv import load_dotenv, find_dotenv
 from crewai_tools import SerperDevTool, ScrapeWebsiteTool, WebsiteSearchTool, tool
@@ -14,6 +16,8 @@ import urllib
 import yfinance as yf
 from datetime import datetime
 
+from aux_finance import fundamentals_cache, fundamental_metrics
+
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
@@ -32,9 +36,15 @@ files = {
 
 # Load configurations from YAML files
 configs = {}
+config_digest = hashlib.sha256()
 for config_type, file_path in files.items():
     with open(file_path, 'r') as file:
-        configs[config_type] = yaml.safe_load(file)
+        raw_config = file.read()
+        configs[config_type] = yaml.safe_load(raw_config)
+        config_digest.update(raw_config.encode('utf-8'))
+
+# Changes whenever an agent or task prompt changes; part of result cache keys
+CONFIG_HASH = config_digest.hexdigest()[:16]
 
 # Assign loaded configurations to specific variables
 agents_config = configs['agents']
@@ -128,6 +138,30 @@ web_search_agent_groq = Agent(
     }
 )
 
+# Groq variants of the web search tasks. Crew.copy() re-binds every task to the
+# crew agent with the same role, so these must point at the Groq agent itself
+blog_find_data_task_groq = Task(
+    config=tasks_config['find_data'],
+    agent=web_search_agent_groq
+)
+
+blog_create_content_task_groq = Task(
+    config=tasks_config['create_content'],
+    agent=blog_content_creator_agent,
+    context=[blog_find_data_task_groq]
+)
+
+social_find_data_task_groq = Task(
+    config=tasks_config['find_data'],
+    agent=web_search_agent_groq
+)
+
+social_create_content_task_groq = Task(
+    config=tasks_config['social_create_content'],
+    agent=post_content_creator_agent,
+    context=[social_find_data_task_groq]
+)
+
 
 
 # IMAGE CREW
@@ -200,52 +234,10 @@ def yf_fundamental_analysis(ticker: str):
     Returns:
         dict: Comprehensive fundamental analysis results.
     """
-    stock = yf.Ticker(ticker)
-    info = stock.info
-    financials = stock.financials
-    balance_sheet = stock.balance_sheet
-    cash_flow = stock.cashflow
-    
-    # Calculate additional financial ratios
-    try:
-        current_ratio = balance_sheet.loc['Total Current Assets'].iloc[-1] / balance_sheet.loc['Total Current Liabilities'].iloc[-1]
-        debt_to_equity = balance_sheet.loc['Total Liabilities'].iloc[-1] / balance_sheet.loc['Total Stockholder Equity'].iloc[-1]
-        roe = financials.loc['Net Income'].iloc[-1] / balance_sheet.loc['Total Stockholder Equity'].iloc[-1]
-        roa = financials.loc['Net Income'].iloc[-1] / balance_sheet.loc['Total Assets'].iloc[-1]
-        
-        # Calculate growth rates
-        revenue_growth = (financials.loc['Total Revenue'].iloc[-1] - financials.loc['Total Revenue'].iloc[-2]) / financials.loc['Total Revenue'].iloc[-2]
-        net_income_growth = (financials.loc['Net Income'].iloc[-1] - financials.loc['Net Income'].iloc[-2]) / financials.loc['Net Income'].iloc[-2]
-        
-        # Free Cash Flow calculation
-        fcf = cash_flow.loc['Operating Cash Flow'].iloc[-1] - cash_flow.loc['Capital Expenditures'].iloc[-1]
-    except:
-        current_ratio = debt_to_equity = roe = roa = revenue_growth = net_income_growth = fcf = None
-    
-    return {
-        "ticker": ticker,
-        "company_name": info.get('longName'),
-        "sector": info.get('sector'),
-        "industry": info.get('industry'),
-        "market_cap": info.get('marketCap'),
-        "pe_ratio": info.get('trailingPE'),
-        "forward_pe": info.get('forwardPE'),
-        "peg_ratio": info.get('pegRatio'),
-        "price_to_book": info.get('priceToBook'),
-        "dividend_yield": info.get('dividendYield'),
-        "beta": info.get('beta'),
-        "52_week_high": info.get('fiftyTwoWeekHigh'),
-        "52_week_low": info.get('fiftyTwoWeekLow'),
-        "current_ratio": current_ratio,
-        "debt_to_equity": debt_to_equity,
-        "return_on_equity": roe,
-        "return_on_assets": roa,
-        "revenue_growth": revenue_growth,
-        "net_income_growth": net_income_growth,
-        "free_cash_flow": fcf,
-        "analyst_recommendation": info.get('recommendationKey'),
-        "target_price": info.get('targetMeanPrice')
-    }
+    # Served from the fundamentals cache; statements only change quarterly
+    data = fundamentals_cache.fundamentals(ticker)
+    return fundamental_metrics(ticker, data['info'], data['financials'],
+                               data['balance_sheet'], data['cashflow'])
 
 # Define Agents
 stock_researcher = Agent(
@@ -276,3 +268,200 @@ stock_analysis_task = Task(
    
 )
 
+
+
+screener_commentary_task = Task(
+    description="Review these fundamental screening results, ranked best first:\n{screen}\n"
+                "Comment on the most attractive and the riskiest names, citing the ratios. "
+                "If a metric does not have a value, omit it",
+    agent=stock_analyst,
+    expected_output="a short, nicely formatted commentary on the top screened stocks"
+)
+
+
+# CONTENT BUNDLE
+
+# The bundle runs find_data once and hands the report to the writers as the
+# {research} input instead of chaining it through a task context
+research_task = Task(
+    config=tasks_config['find_data'],
+    agent=web_search_agent
+)
+
+research_task_groq = Task(
+    config=tasks_config['find_data'],
+    agent=web_search_agent_groq
+)
+
+
+def _with_research(task_config):
+    task_config = dict(task_config)
+    task_config['description'] = task_config['description'] + "\nResearch report:\n{research}\n"
+    return task_config
+
+
+bundle_blog_task = Task(
+    config=_with_research(tasks_config['create_content']),
+    agent=blog_content_creator_agent
+)
+
+bundle_social_task = Task(
+    config=_with_research(tasks_config['social_create_content']),
+    agent=post_content_creator_agent
+)
+
+
+# CREW PIPELINES
+
+# Task names per pipeline, in execution order
+CREW_PIPELINES = {
+    'blog': ['blog_find_data_task', 'blog_create_content_task'],
+    'posts': ['social_find_data_task', 'social_create_content_task'],
+    'images': ['search_task'],
+    'latest_news': ['financial_find_news_task', 'financial_create_content_task'],
+    'fundamental_analysis': ['stock_research_task', 'stock_analysis_task'],
+    'research': ['research_task'],
+    'bundle_blog': ['bundle_blog_task'],
+    'bundle_posts': ['bundle_social_task'],
+    'screener_commentary': ['screener_commentary_task'],
+}
+
+# Name of the kickoff input each pipeline expects
+CREW_INPUTS = {
+    'blog': 'subject',
+    'posts': 'subject',
+    'images': 'context',
+    'latest_news': 'subject',
+    'fundamental_analysis': 'ticker',
+    'research': 'subject',
+    'bundle_blog': 'subject',
+    'bundle_posts': 'subject',
+    'screener_commentary': 'screen',
+}
+
+# Pipelines whose web search can run on Groq
+GROQ_PIPELINES = {'blog', 'posts', 'research'}
+
+
+def build_crew(pipeline: str, option: int = 1) -> Crew:
+    """
+    Assemble the crew for a pipeline
+
+    option 1 runs the web search with OpenAI, any other value with Llama 3 on Groq.
+    """
+    groq = option != 1
+
+    if pipeline == 'blog':
+        if groq:
+            agents = [web_search_agent_groq, blog_content_creator_agent]
+            tasks = [blog_find_data_task_groq, blog_create_content_task_groq]
+        else:
+            agents = [web_search_agent, blog_content_creator_agent]
+            tasks = [blog_find_data_task, blog_create_content_task]
+    elif pipeline == 'posts':
+        if groq:
+            agents = [web_search_agent_groq, post_content_creator_agent]
+            tasks = [social_find_data_task_groq, social_create_content_task_groq]
+        else:
+            agents = [web_search_agent, post_content_creator_agent]
+            tasks = [social_find_data_task, social_create_content_task]
+    elif pipeline == 'images':
+        agents = [image_searcher]
+        tasks = [search_task]
+    elif pipeline == 'latest_news':
+        agents = [financial_search_agent, financial_content_creator_agent]
+        tasks = [financial_find_news_task, financial_create_content_task]
+    elif pipeline == 'fundamental_analysis':
+        agents = [stock_researcher, stock_analyst]
+        tasks = [stock_research_task, stock_analysis_task]
+    elif pipeline == 'research':
+        agents = [web_search_agent_groq if groq else web_search_agent]
+        tasks = [research_task_groq if groq else research_task]
+    elif pipeline == 'bundle_blog':
+        agents = [blog_content_creator_agent]
+        tasks = [bundle_blog_task]
+    elif pipeline == 'bundle_posts':
+        agents = [post_content_creator_agent]
+        tasks = [bundle_social_task]
+    elif pipeline == 'screener_commentary':
+        agents = [stock_analyst]
+        tasks = [screener_commentary_task]
+    else:
+        raise ValueError(f"Unknown crew pipeline: {pipeline}")
+
+    return Crew(
+        agents=agents,
+        tasks=tasks,
+        process=Process.sequential,
+        verbose=True
+    )
+
+
+class CrewRegistry:
+    """
+    Crew templates built once at startup, keyed by (pipeline, provider)
+
+    get() hands out a copy of the template with its own Agent and Task
+    objects, so concurrent kickoffs never share task outputs or callbacks.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def provider(pipeline: str, option: int = 1) -> str:
+        if option != 1 and pipeline in GROQ_PIPELINES:
+            return 'groq'
+        return 'openai'
+
+    def build_all(self):
+        """Build every template up front"""
+        for pipeline in CREW_PIPELINES:
+            self.template(pipeline, 1)
+            if pipeline in GROQ_PIPELINES:
+                self.template(pipeline, 2)
+
+    def template(self, pipeline: str, option: int = 1) -> Crew:
+        key = (pipeline, self.provider(pipeline, option))
+        template = self._templates.get(key)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(key)
+                if template is None:
+                    template = build_crew(pipeline, option)
+                    self._templates[key] = template
+        return template
+
+    def get(self, pipeline: str, option: int = 1) -> Crew:
+        """Per-request copy of the crew template"""
+        return self.template(pipeline, option).copy()
+
+
+crew_registry = CrewRegistry()
+
+
+def attach_task_callback(crew: Crew, pipeline: str, callback):
+    """
+    Call callback(task_name, output) when each task of the crew finishes
+
+    Only use on a crew copy: the callback is stored on the Task objects themselves.
+    """
+    for name, task in zip(CREW_PIPELINES[pipeline], crew.tasks):
+        task.callback = lambda output, name=name: callback(name, output)
+    return crew
+
+
+def attach_step_callback(crew: Crew, callback):
+    """Call callback(step) after every agent step (tool calls included). Copies only."""
+    for agent in crew.agents:
+        agent.step_callback = callback
+    return crew
+
+
+def stream_final_task(crew: Crew):
+    """Switch the LLM of the agent running the last task to token streaming. Copies only."""
+    llm = getattr(crew.tasks[-1].agent, 'llm', None)
+    if llm is not None and hasattr(llm, 'stream'):
+        llm.stream = True
+    return crew
@@ -0,0 +1,240 @@
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pydantic import PrivateAttr
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.utils import get_tokenizer
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+# Constants
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "openai")  # "openai" or "local"
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-ada-002")
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "data/embedding_cache")  # empty disables the cache
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# OpenAI caps one embedding request at 300k tokens summed over its inputs
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "250000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+LOCAL_EMBED_DIM = int(os.getenv("LOCAL_EMBED_DIM", "384"))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk store of embeddings for one model
+
+    Vectors live in a raw float32 matrix file (vectors.f32) that is read
+    through a memory map; keys.txt holds one text hash per row. Rows are
+    written before their keys, so a torn append never exposes a partial
+    vector.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.cache_dir / "vectors.f32"
+        self._keys_path = self.cache_dir / "keys.txt"
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._dim = None
+        self._matrix = None
+        self._load()
+
+    def _load(self):
+        if not self._keys_path.exists() or not self._vectors_path.exists():
+            return
+        keys = self._keys_path.read_text().split()
+        dim_path = self.cache_dir / "dim"
+        if not keys or not dim_path.exists():
+            return
+        self._dim = int(dim_path.read_text())
+        complete_rows = self._vectors_path.stat().st_size // (4 * self._dim)
+        if len(keys) > complete_rows:
+            keys = keys[:complete_rows]
+            self._keys_path.write_text("".join(key + "\n" for key in keys))
+        self._rows = {key: row for row, key in enumerate(keys)}
+        self._remap()
+
+    def _remap(self):
+        rows = len(self._rows)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                 shape=(rows, self._dim)) if rows else None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys) -> dict:
+        """Cached vectors for the keys that are present"""
+        with self._lock:
+            found = {key: self._rows[key] for key in keys if key in self._rows}
+            if not found:
+                return {}
+            vectors = np.asarray(self._matrix[list(found.values())])
+        return {key: vectors[i].tolist() for i, key in enumerate(found)}
+
+    def put_many(self, keys, vectors):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+                (self.cache_dir / "dim").write_text(str(self._dim))
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match cache dimension {self._dim}")
+            new = [i for i, key in enumerate(keys) if key not in self._rows]
+            if not new:
+                return
+            # Drop any torn tail from an interrupted append before writing
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(len(self._rows) * self._dim * 4)
+                f.write(matrix[new].tobytes())
+            with open(self._keys_path, "a") as f:
+                f.write("".join(keys[i] + "\n" for i in new))
+            for i in new:
+                self._rows[keys[i]] = len(self._rows)
+            self._remap()
+
+
+class HashEmbedding(BaseEmbedding):
+    """
+    Deterministic local embedding for offline runs and benchmarks
+
+    Hashes lowercase word unigrams and bigrams into a fixed number of
+    buckets with signed counts, then L2-normalizes. No network, no model
+    download, and the same text always gives the same vector.
+    """
+
+    dim: int = LOCAL_EMBED_DIM
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _vector(self, text: str) -> list:
+        words = re.findall(r"\w+", text.lower())
+        features = words + [a + " " + b for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            digests = [hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features]
+            values = np.frombuffer(b"".join(digests), dtype=np.uint64)
+            signs = np.where(values >> np.uint64(63), -1.0, 1.0)
+            np.add.at(vector, (values % np.uint64(self.dim)).astype(np.int64), signs)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector.tolist()
+
+    def _get_query_embedding(self, query: str) -> list:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> list:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> list:
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts) -> list:
+        return [self._vector(text) for text in texts]
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps an embedding model with a persistent cache keyed on text hash
+
+    The cache directory is per model, so switching models never mixes
+    vectors. Only cache misses reach the wrapped model, deduplicated and
+    sent in batches of at most EMBED_BATCH_SIZE texts and EMBED_BATCH_TOKENS
+    tokens, with at most EMBED_CONCURRENCY requests in flight.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _batch_size: int = PrivateAttr()
+    _batch_tokens: int = PrivateAttr()
+    _pool: ThreadPoolExecutor = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache_dir=EMBED_CACHE_DIR, batch_size: int = EMBED_BATCH_SIZE,
+                 batch_tokens: int = EMBED_BATCH_TOKENS, concurrency: int = EMBED_CONCURRENCY, **kwargs):
+        model_id = f"{inner.class_name()}-{inner.model_name}"
+        # The base class splits inputs by embed_batch_size before _get_text_embeddings;
+        # make its batches large so the cache lookup sees many texts at once
+        super().__init__(model_name=model_id, embed_batch_size=2048, **kwargs)
+        self._inner = inner
+        self._cache = EmbeddingCache(Path(cache_dir) / re.sub(r"[^\w.-]", "_", model_id))
+        self._batch_size = batch_size
+        self._batch_tokens = batch_tokens
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    def _get_query_embedding(self, query: str) -> list:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> list:
+        return await self._inner.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> list:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts) -> list:
+        keys = [text_hash(text) for text in texts]
+        vectors = self._cache.get_many(keys)
+
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                misses.setdefault(key, text)
+        if misses:
+            batches = self._batches(misses)
+            results = self._pool.map(
+                lambda batch: self._inner._get_text_embeddings([misses[key] for key in batch]), batches
+            )
+            for batch, embeddings in zip(batches, results):
+                self._cache.put_many(batch, embeddings)
+                vectors.update(zip(batch, embeddings))
+        return [vectors[key] for key in keys]
+
+    def _batches(self, texts: dict) -> list:
+        """Split {key: text} into key lists within the per-request text and token limits"""
+        tokenizer = get_tokenizer()
+        batches, batch, tokens = [], [], 0
+        for key, text in texts.items():
+            size = len(tokenizer(text))
+            if batch and (len(batch) >= self._batch_size or tokens + size > self._batch_tokens):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(key)
+            tokens += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _aget_text_embeddings(self, texts) -> list:
+        return await asyncio.to_thread(self._get_text_embeddings, texts)
+
+
+@lru_cache(maxsize=1)
+def get_embed_model() -> BaseEmbedding:
+    """Embedding model selected by EMBED_BACKEND, behind the persistent cache"""
+    if EMBED_BACKEND == "local":
+        model = HashEmbedding(model_name=f"hash-{LOCAL_EMBED_DIM}", dim=LOCAL_EMBED_DIM)
+    else:
+        model = OpenAIEmbedding(model=EMBED_MODEL)
+    if EMBED_CACHE_DIR:
+        model = CachedEmbedding(model)
+    return model
@@ -0,0 +1,563 @@
+import io
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from matplotlib.figure import Figure
+from matplotlib import dates as mdates
+
+from aux_cache import TTLCache, SingleFlight, hash_key
+from aux_indicators import compute_indicators, lttb_indices
+
+# Constants
+PRICE_DB_PATH = Path(os.getenv("PRICE_DB_PATH", "data/prices.db"))
+PRICE_FRESHNESS_SECONDS = int(os.getenv("PRICE_FRESHNESS_SECONDS", "900"))
+VALID_PERIODS = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+PRICE_COVERAGE_SLACK_DAYS = 7  # weekends and holidays between a period start and its first bar
+CHART_POOL_SIZE = int(os.getenv("CHART_POOL_SIZE", str(os.cpu_count() or 2)))
+CHART_FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml',
+}
+FUNDAMENTALS_DB_PATH = Path(os.getenv("FUNDAMENTALS_DB_PATH", "data/fundamentals.db"))
+# Seconds each kind of yfinance data stays fresh: quotes move, statements change quarterly
+FUNDAMENTALS_TTLS = {
+    'info': int(os.getenv("FUNDAMENTALS_INFO_TTL", str(15 * 60))),
+    'financials': int(os.getenv("FUNDAMENTALS_STATEMENTS_TTL", str(7 * 24 * 3600))),
+    'balance_sheet': int(os.getenv("FUNDAMENTALS_STATEMENTS_TTL", str(7 * 24 * 3600))),
+    'cashflow': int(os.getenv("FUNDAMENTALS_STATEMENTS_TTL", str(7 * 24 * 3600))),
+}
+FUNDAMENTALS_WATCHLIST = [t.strip().upper() for t in os.getenv("FUNDAMENTALS_WATCHLIST", "").split(',') if t.strip()]
+SCREENER_WORKERS = int(os.getenv("SCREENER_WORKERS", "16"))
+SCREENER_TEXT_COLUMNS = ['company_name', 'sector', 'industry']  # every other column is numeric
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "300"))  # longer series are downsampled
+CHART_CACHE_TTL = int(os.getenv("CHART_CACHE_TTL", str(24 * 3600)))
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "128"))
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", "data/chart_cache")  # empty disables the disk tier
+
+
+def period_start(period: str, today=None):
+    """First calendar date covered by a yfinance period, None for 'max'"""
+    today = today or datetime.now().date()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return today.replace(month=1, day=1)
+    if period.endswith('mo'):
+        return today - timedelta(days=31 * int(period[:-2]))
+    if period.endswith('y'):
+        return today - timedelta(days=366 * int(period[:-1]))
+    if period.endswith('d'):
+        # Leave room for weekends and holidays
+        return today - timedelta(days=int(period[:-1]) + 4)
+    raise ValueError(f"Invalid period: {period}")
+
+
+def has_new_actions(df: pd.DataFrame, last) -> bool:
+    """Whether a refresh from the last stored date brings a split or dividend after it"""
+    if df is None or df.empty:
+        return False
+    actions = df[[column for column in ACTION_COLUMNS if column in df.columns]]
+    later = actions[actions.index.date > last]
+    return bool((later.fillna(0) != 0).to_numpy().any())
+
+
+class PriceHistoryStore:
+    """
+    Persistent daily OHLCV bars per ticker with incremental refresh
+
+    A request downloads the full period only the first time a ticker (or a
+    longer period) is seen. Afterwards only the bars from the last stored
+    date onwards are fetched, and nothing at all within the freshness window.
+    Bars are split and dividend adjusted, so a new split or dividend in a
+    refresh re-downloads the whole covered range.
+    """
+
+    def __init__(self, db_path: Path = PRICE_DB_PATH, freshness: int = PRICE_FRESHNESS_SECONDS):
+        self.freshness = freshness
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.RLock()
+        self._ticker_locks = {}
+        with self._lock:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                " ticker TEXT NOT NULL, date TEXT NOT NULL,"
+                " open REAL, high REAL, low REAL, close REAL, volume REAL,"
+                " PRIMARY KEY (ticker, date));"
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                " ticker TEXT PRIMARY KEY, start TEXT, full INTEGER NOT NULL DEFAULT 0,"
+                " fetched_at REAL NOT NULL);"
+            )
+            self._conn.commit()
+
+    def _ticker_lock(self, ticker: str):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def history(self, ticker: str, period: str = '1y') -> pd.DataFrame:
+        """Daily OHLCV bars for the period, refreshing the store if needed"""
+        if period not in VALID_PERIODS:
+            raise ValueError(f"Invalid period. Please use one of: {', '.join(VALID_PERIODS)}")
+        ticker = ticker.upper()
+        start = period_start(period)
+
+        with self._ticker_lock(ticker):
+            coverage = self._coverage(ticker)
+            if self._needs_full_download(coverage, start):
+                self.store(ticker, yf.Ticker(ticker).history(period=period),
+                           start=start, full=start is None)
+            elif time.time() - coverage['fetched_at'] > self.freshness:
+                last = self.last_bar_date(ticker)
+                if last is None:
+                    self.store(ticker, yf.Ticker(ticker).history(period=period),
+                               start=start, full=start is None)
+                else:
+                    # Re-fetch the last stored bar too: it may have been an intraday snapshot
+                    df = yf.Ticker(ticker).history(start=last.isoformat())
+                    if has_new_actions(df, last):
+                        self.reload(ticker, coverage)
+                    else:
+                        self.store(ticker, df)
+
+        return self.load(ticker, start)
+
+    def reload(self, ticker: str, coverage: dict):
+        """Replace every stored bar with a fresh download of the covered range (call under the ticker lock)"""
+        if coverage['full'] or not coverage['start']:
+            self.store(ticker, yf.Ticker(ticker).history(period='max'), full=True, replace=True)
+        else:
+            start = datetime.strptime(coverage['start'], '%Y-%m-%d').date()
+            self.store(ticker, yf.Ticker(ticker).history(start=coverage['start']), start=start, replace=True)
+
+    def history_many(self, tickers, period: str = '1y') -> dict:
+        """
+        Daily OHLCV bars for several tickers, refreshing them with bulk downloads
+
+        Tickers that need a full download are fetched in one yf.download call,
+        tickers that only need new bars in another. Returns ticker -> DataFrame.
+        """
+        if period not in VALID_PERIODS:
+            raise ValueError(f"Invalid period. Please use one of: {', '.join(VALID_PERIODS)}")
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        start = period_start(period)
+
+        with ExitStack() as locks:
+            # Same per-ticker locks as history(), taken in a fixed order
+            for ticker in sorted(tickers):
+                locks.enter_context(self._ticker_lock(ticker))
+
+            full, incremental = [], {}
+            for ticker in tickers:
+                coverage = self._coverage(ticker)
+                if self._needs_full_download(coverage, start):
+                    full.append(ticker)
+                elif time.time() - coverage['fetched_at'] > self.freshness:
+                    last = self.last_bar_date(ticker)
+                    if last is None:
+                        full.append(ticker)
+                    else:
+                        incremental[ticker] = last
+
+            if full:
+                frames = self._bulk_download(full, period=period)
+                # Tickers missing from the result record no coverage and are retried next time
+                for ticker in full:
+                    if ticker in frames:
+                        self.store(ticker, frames[ticker], start=start, full=start is None)
+            if incremental:
+                frames = self._bulk_download(list(incremental), start=min(incremental.values()).isoformat())
+                for ticker, last in incremental.items():
+                    if ticker not in frames:
+                        continue
+                    if has_new_actions(frames[ticker], last):
+                        self.reload(ticker, self._coverage(ticker))
+                    else:
+                        self.store(ticker, frames[ticker])
+
+        return {ticker: self.load(ticker, start) for ticker in tickers}
+
+    @staticmethod
+    def _bulk_download(tickers, **kwargs) -> dict:
+        data = yf.download(tickers, group_by='ticker', auto_adjust=True, actions=True,
+                           threads=True, progress=False, **kwargs)
+        frames = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker]
+            else:
+                df = data
+            frames[ticker] = df.dropna(subset=['Close'])
+        return frames
+
+    def store(self, ticker: str, df: pd.DataFrame, start=None, full: bool = False, replace: bool = False):
+        """
+        Upsert downloaded bars and record what has been covered
+
+        An empty download records nothing, so the next request tries again.
+        The coverage only widens as far back as the bars actually reach.
+        replace drops the bars stored before, e.g. after a split.
+        """
+        ticker = ticker.upper()
+        if df is None or df.empty:
+            return
+        rows = []
+        for date, row in df[OHLCV_COLUMNS].iterrows():
+            rows.append((ticker, date.strftime('%Y-%m-%d'), float(row['Open']), float(row['High']),
+                         float(row['Low']), float(row['Close']), float(row['Volume'])))
+        first = min(row[1] for row in rows)
+        if start is not None and first > (start + timedelta(days=PRICE_COVERAGE_SLACK_DAYS)).isoformat():
+            # Fewer bars than asked for: only claim what came back
+            start = datetime.strptime(first, '%Y-%m-%d').date()
+
+        with self._lock:
+            if replace:
+                self._conn.execute("DELETE FROM bars WHERE ticker = ?", (ticker,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars (ticker, date, open, high, low, close, volume)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            coverage = None if replace else self._coverage(ticker)
+            is_full = full or bool(coverage and coverage['full'])
+            # An incremental refresh (no start) keeps the earlier coverage start
+            starts = [s for s in (coverage and coverage['start'], start and start.isoformat()) if s]
+            covered_start = None if is_full or not starts else min(starts)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage (ticker, start, full, fetched_at) VALUES (?, ?, ?, ?)",
+                (ticker, covered_start, int(is_full), time.time())
+            )
+            self._conn.commit()
+
+    def load(self, ticker: str, start=None) -> pd.DataFrame:
+        """Stored bars from start onwards as a DataFrame indexed by date"""
+        query = "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ?"
+        params = [ticker.upper()]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY date", params).fetchall()
+        df = pd.DataFrame(rows, columns=['Date'] + OHLCV_COLUMNS)
+        df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date')), name='Date')
+        return df
+
+    def last_bar_date(self, ticker: str):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(date) FROM bars WHERE ticker = ?", (ticker.upper(),)).fetchone()
+        return datetime.strptime(row[0], '%Y-%m-%d').date() if row and row[0] else None
+
+    def _coverage(self, ticker: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT start, full, fetched_at FROM coverage WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'start': row[0], 'full': bool(row[1]), 'fetched_at': row[2]}
+
+    @staticmethod
+    def _needs_full_download(coverage, start) -> bool:
+        if coverage is None:
+            return True
+        if coverage['full']:
+            return False
+        if start is None:
+            return True
+        return coverage['start'] is None or coverage['start'] > start.isoformat()
+
+
+price_store = PriceHistoryStore()
+
+
+class FundamentalsCache:
+    """
+    Disk-backed cache of yfinance fundamentals with a TTL per data kind
+
+    Each (ticker, kind) is fetched at most once per TTL and kept as a pickle
+    in SQLite, so it survives restarts. If a refresh fails, the stale copy
+    is returned rather than nothing.
+    """
+
+    def __init__(self, db_path: Path = FUNDAMENTALS_DB_PATH, ttls: dict = None):
+        self.ttls = dict(ttls or FUNDAMENTALS_TTLS)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fundamentals ("
+                " ticker TEXT NOT NULL, kind TEXT NOT NULL, fetched_at REAL NOT NULL,"
+                " payload BLOB NOT NULL, PRIMARY KEY (ticker, kind))"
+            )
+            self._conn.commit()
+
+    def get(self, ticker: str, kind: str, stock=None):
+        """One kind of data ('info', 'financials', 'balance_sheet', 'cashflow')"""
+        if kind not in self.ttls:
+            raise ValueError(f"Unknown fundamentals kind: {kind}")
+        ticker = ticker.upper()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, payload FROM fundamentals WHERE ticker = ? AND kind = ?", (ticker, kind)
+            ).fetchone()
+        if row and time.time() - row[0] < self.ttls[kind]:
+            return pickle.loads(row[1])
+
+        try:
+            value = getattr(stock or yf.Ticker(ticker), kind)
+        except Exception:
+            if row:
+                return pickle.loads(row[1])
+            raise
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fundamentals (ticker, kind, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                (ticker, kind, time.time(), pickle.dumps(value))
+            )
+            self._conn.commit()
+        return value
+
+    def fundamentals(self, ticker: str) -> dict:
+        """Every kind for a ticker, sharing one yf.Ticker for the misses"""
+        stock = yf.Ticker(ticker.upper())
+        return {kind: self.get(ticker, kind, stock) for kind in self.ttls}
+
+    def prewarm(self, tickers):
+        """Fill the cache for a watchlist; failures are logged and skipped"""
+        for ticker in tickers:
+            try:
+                self.fundamentals(ticker)
+            except Exception as e:
+                print(f"Could not prewarm fundamentals for {ticker}: {str(e)}")
+
+
+fundamentals_cache = FundamentalsCache()
+
+
+def fundamental_metrics(ticker: str, info, financials, balance_sheet, cash_flow) -> dict:
+    """Key ratios, growth rates and free cash flow from yfinance statements"""
+    # Calculate additional financial ratios
+    try:
+        current_ratio = balance_sheet.loc['Total Current Assets'].iloc[-1] / balance_sheet.loc['Total Current Liabilities'].iloc[-1]
+        debt_to_equity = balance_sheet.loc['Total Liabilities'].iloc[-1] / balance_sheet.loc['Total Stockholder Equity'].iloc[-1]
+        roe = financials.loc['Net Income'].iloc[-1] / balance_sheet.loc['Total Stockholder Equity'].iloc[-1]
+        roa = financials.loc['Net Income'].iloc[-1] / balance_sheet.loc['Total Assets'].iloc[-1]
+        
+        # Calculate growth rates
+        revenue_growth = (financials.loc['Total Revenue'].iloc[-1] - financials.loc['Total Revenue'].iloc[-2]) / financials.loc['Total Revenue'].iloc[-2]
+        net_income_growth = (financials.loc['Net Income'].iloc[-1] - financials.loc['Net Income'].iloc[-2]) / financials.loc['Net Income'].iloc[-2]
+        
+        # Free Cash Flow calculation
+        fcf = cash_flow.loc['Operating Cash Flow'].iloc[-1] - cash_flow.loc['Capital Expenditures'].iloc[-1]
+    except:
+        current_ratio = debt_to_equity = roe = roa = revenue_growth = net_income_growth = fcf = None
+    
+    return {
+        "ticker": ticker,
+        "company_name": info.get('longName'),
+        "sector": info.get('sector'),
+        "industry": info.get('industry'),
+        "market_cap": info.get('marketCap'),
+        "pe_ratio": info.get('trailingPE'),
+        "forward_pe": info.get('forwardPE'),
+        "peg_ratio": info.get('pegRatio'),
+        "price_to_book": info.get('priceToBook'),
+        "dividend_yield": info.get('dividendYield'),
+        "beta": info.get('beta'),
+        "52_week_high": info.get('fiftyTwoWeekHigh'),
+        "52_week_low": info.get('fiftyTwoWeekLow'),
+        "current_ratio": current_ratio,
+        "debt_to_equity": debt_to_equity,
+        "return_on_equity": roe,
+        "return_on_assets": roa,
+        "revenue_growth": revenue_growth,
+        "net_income_growth": net_income_growth,
+        "free_cash_flow": fcf,
+        "analyst_recommendation": info.get('recommendationKey'),
+        "target_price": info.get('targetMeanPrice')
+    }
+
+
+# Statement line items used by the screener. The first label is the one
+# fundamental_metrics uses; the others are newer yfinance spellings.
+SCREENER_LINE_ITEMS = {
+    'current_assets': ('balance_sheet', ['Total Current Assets', 'Current Assets']),
+    'current_liabilities': ('balance_sheet', ['Total Current Liabilities', 'Current Liabilities']),
+    'total_liabilities': ('balance_sheet', ['Total Liabilities', 'Total Liabilities Net Minority Interest']),
+    'equity': ('balance_sheet', ['Total Stockholder Equity', 'Stockholders Equity']),
+    'total_assets': ('balance_sheet', ['Total Assets']),
+    'net_income': ('financials', ['Net Income']),
+    'revenue': ('financials', ['Total Revenue']),
+    'operating_cash_flow': ('cashflow', ['Operating Cash Flow']),
+    'capital_expenditures': ('cashflow', ['Capital Expenditures', 'Capital Expenditure']),
+}
+
+SCREENER_INFO_FIELDS = {
+    'company_name': 'longName',
+    'sector': 'sector',
+    'industry': 'industry',
+    'market_cap': 'marketCap',
+    'pe_ratio': 'trailingPE',
+    'forward_pe': 'forwardPE',
+    'peg_ratio': 'pegRatio',
+    'price_to_book': 'priceToBook',
+    'dividend_yield': 'dividendYield',
+    'beta': 'beta',
+}
+
+
+def _statement_value(statement, labels, position):
+    if statement is None or getattr(statement, 'empty', True):
+        return np.nan
+    for label in labels:
+        if label in statement.index:
+            row = statement.loc[label]
+            if -len(row) <= position < len(row):
+                return row.iloc[position]
+    return np.nan
+
+
+# Shared by all screener requests, so concurrent screens cannot multiply the fetch threads
+screener_pool = ThreadPoolExecutor(max_workers=SCREENER_WORKERS, thread_name_prefix="screener")
+
+
+def fetch_fundamentals_many(tickers):
+    """Fundamentals for many tickers through the cache, fetched concurrently"""
+    results, errors = {}, {}
+    futures = {ticker: screener_pool.submit(fundamentals_cache.fundamentals, ticker) for ticker in tickers}
+    for ticker, future in futures.items():
+        try:
+            results[ticker] = future.result()
+        except Exception as e:
+            errors[ticker] = str(e)
+    return results, errors
+
+
+def screen_fundamentals(data: dict) -> pd.DataFrame:
+    """
+    The ratios of fundamental_metrics for a whole universe as one DataFrame
+
+    Raw line items are collected per ticker; every ratio is then computed as
+    a column operation across all tickers at once.
+    """
+    rows = []
+    for ticker, kinds in data.items():
+        info = kinds.get('info') or {}
+        row = {'ticker': ticker}
+        row.update({column: info.get(field) for column, field in SCREENER_INFO_FIELDS.items()})
+        for column, (kind, labels) in SCREENER_LINE_ITEMS.items():
+            row[column] = _statement_value(kinds.get(kind), labels, -1)
+        row['revenue_prev'] = _statement_value(kinds.get('financials'), ['Total Revenue'], -2)
+        row['net_income_prev'] = _statement_value(kinds.get('financials'), ['Net Income'], -2)
+        rows.append(row)
+
+    df = pd.DataFrame(rows).set_index('ticker')
+    for column in SCREENER_INFO_FIELDS:
+        if column not in SCREENER_TEXT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    raw = df[list(SCREENER_LINE_ITEMS) + ['revenue_prev', 'net_income_prev']].apply(pd.to_numeric, errors='coerce')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['current_ratio'] = raw['current_assets'] / raw['current_liabilities']
+        df['debt_to_equity'] = raw['total_liabilities'] / raw['equity']
+        df['return_on_equity'] = raw['net_income'] / raw['equity']
+        df['return_on_assets'] = raw['net_income'] / raw['total_assets']
+        df['revenue_growth'] = (raw['revenue'] - raw['revenue_prev']) / raw['revenue_prev']
+        df['net_income_growth'] = (raw['net_income'] - raw['net_income_prev']) / raw['net_income_prev']
+        df['free_cash_flow'] = raw['operating_cash_flow'] - raw['capital_expenditures']
+
+    df = df.drop(columns=list(raw.columns))
+    return df.replace([np.inf, -np.inf], np.nan)
+
+
+def render_ta_chart(df: pd.DataFrame, ticker: str, width: float = 15, height: float = 10,
+                    dpi: int = 300, fmt: str = 'png', max_points: int = CHART_MAX_POINTS) -> bytes:
+    """
+    Render a technical analysis chart with MACD and Moving Averages
+
+    Uses a standalone Figure rather than pyplot, so calls share no global
+    state and can run concurrently in threads or worker processes. Series
+    longer than max_points are downsampled with LTTB before plotting, so a
+    'max' chart costs about the same as a one-year chart.
+    Returns the encoded image bytes.
+    """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Invalid format. Please use one of: {', '.join(CHART_FORMATS)}")
+
+    # Indicators use the full daily series; only the plotted points are thinned out
+    indicators = compute_indicators(df)
+    keep = lttb_indices(df['Close'].to_numpy(dtype=np.float64), max_points)
+    if len(keep) < len(df):
+        df = df.iloc[keep]
+        indicators = {name: values[keep] for name, values in indicators.items()}
+
+    macd = indicators['macd']
+    macd_hist = indicators['macd_hist']
+
+    fig = Figure(figsize=(width, height))
+    try:
+        ax1, ax2 = fig.subplots(2, 1, height_ratios=[2, 1])
+        fig.suptitle(f'{ticker} Technical Analysis Chart', fontsize=16)
+
+        # Plot price and MAs
+        ax1.plot(df.index, df['Close'], label='Price', color='black', alpha=0.7)
+        ax1.plot(df.index, indicators['sma_50'], label='50 MA', color='blue', alpha=0.7)
+        ax1.plot(df.index, indicators['sma_200'], label='200 MA', color='red', alpha=0.7)
+        ax1.set_title('Price and Moving Averages')
+        ax1.set_ylabel('Price')
+        ax1.grid(True, alpha=0.3)
+        ax1.legend()
+
+        # Plot MACD
+        ax2.plot(df.index, macd, label='MACD', color='blue')
+        ax2.plot(df.index, indicators['macd_signal'], label='Signal', color='red')
+        # Bars span the typical gap between plotted points, which grows once LTTB thins the series
+        steps = np.diff(mdates.date2num(df.index))
+        bar_width = float(np.median(steps)) if len(steps) else 0.8
+        ax2.bar(df.index, macd_hist, width=bar_width, label='Histogram',
+                color=np.where(macd_hist >= 0, 'green', 'red'),
+                alpha=0.5)
+        ax2.set_title('MACD')
+        ax2.set_ylabel('MACD')
+        ax2.grid(True, alpha=0.3)
+        ax2.legend()
+
+        fig.tight_layout()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def chart_cache_key(ticker: str, period: str, df: pd.DataFrame, *render_options) -> str:
+    """
+    Content address of a chart: the same key always renders the same image
+
+    The last bar's date and close stand in for the data, so the key changes
+    as soon as a new (or updated intraday) bar arrives.
+    """
+    last_bar = (df.index[-1].isoformat(), float(df['Close'].iloc[-1])) if not df.empty else None
+    return hash_key('chart', ticker.upper(), period, last_bar, CHART_MAX_POINTS, *render_options)
+
+
+# Chart rendering is CPU bound, so it runs in worker processes
+chart_pool = ProcessPoolExecutor(max_workers=CHART_POOL_SIZE)
+chart_cache = TTLCache(CHART_CACHE_MAX_ENTRIES, CHART_CACHE_TTL, CHART_CACHE_DIR or None)
+chart_flights = SingleFlight()
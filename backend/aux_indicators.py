@@ -0,0 +1,149 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Constants
+SMA_WINDOWS = (50, 200)
+EMA_WINDOWS = (12, 26)
+MACD_SIGNAL = 9
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_STD = 2.0
+ATR_WINDOW = 14
+
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    """Simple moving average; NaN until n values are available"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        csum = np.cumsum(np.insert(x, 0, 0.0))
+        out[n - 1:] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def _recursive_average(x: np.ndarray, n: int, alpha: float) -> np.ndarray:
+    """Exponential smoothing seeded with the SMA of the first n valid values"""
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) < n:
+        return out
+    start = valid[0] + n - 1
+    # Seeding the first value makes the recursive (adjust=False) ewm start from the SMA
+    seeded = x[start:].copy()
+    seeded[0] = x[valid[0]:start + 1].mean()
+    out[start:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def ema(x: np.ndarray, n: int) -> np.ndarray:
+    """Exponential moving average with the usual 2 / (n + 1) smoothing"""
+    return _recursive_average(x, n, 2.0 / (n + 1))
+
+
+def wilder(x: np.ndarray, n: int) -> np.ndarray:
+    """Wilder's smoothing (alpha = 1 / n), as used by RSI and ATR"""
+    return _recursive_average(x, n, 1.0 / n)
+
+
+def rolling_std(x: np.ndarray, n: int) -> np.ndarray:
+    """Population standard deviation over a sliding window"""
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = np.lib.stride_tricks.sliding_window_view(x, n).std(axis=1)
+    return out
+
+
+def rsi(close: np.ndarray, n: int = RSI_WINDOW) -> np.ndarray:
+    delta = np.diff(close, prepend=np.nan)
+    avg_gain = wilder(np.where(delta > 0, delta, 0.0)[1:], n)
+    avg_loss = wilder(np.where(delta < 0, -delta, 0.0)[1:], n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    return np.concatenate(([np.nan], values))
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    ranges = np.vstack((high - low, np.abs(high - prev_close), np.abs(low - prev_close)))
+    return np.nanmax(ranges, axis=0)
+
+
+def compute_indicators(df: pd.DataFrame) -> dict:
+    """
+    Compute every indicator for an OHLCV frame in one pass over its arrays
+
+    Returns a dict of column name -> float64 array aligned with df.index.
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+
+    columns = {}
+    for n in SMA_WINDOWS:
+        columns[f'sma_{n}'] = sma(close, n)
+    for n in EMA_WINDOWS:
+        columns[f'ema_{n}'] = ema(close, n)
+
+    macd = columns[f'ema_{EMA_WINDOWS[0]}'] - columns[f'ema_{EMA_WINDOWS[1]}']
+    signal = ema(macd, MACD_SIGNAL)
+    columns['macd'] = macd
+    columns['macd_signal'] = signal
+    columns['macd_hist'] = macd - signal
+
+    columns[f'rsi_{RSI_WINDOW}'] = rsi(close, RSI_WINDOW)
+
+    middle = sma(close, BOLLINGER_WINDOW)
+    width = BOLLINGER_STD * rolling_std(close, BOLLINGER_WINDOW)
+    columns['bb_middle'] = middle
+    columns['bb_upper'] = middle + width
+    columns['bb_lower'] = middle - width
+
+    columns[f'atr_{ATR_WINDOW}'] = wilder(true_range(high, low, close), ATR_WINDOW)
+    return columns
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices kept by Largest-Triangle-Three-Buckets downsampling of y
+
+    Keeps the first and last points plus, for every bucket, the point that
+    forms the largest triangle with the previous pick and the next bucket's
+    average, which preserves the visual shape of the series.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picks = np.empty(threshold, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:max(next_end, next_start + 1)].mean()
+        avg_y = np.nanmean(y[next_start:max(next_end, next_start + 1)])
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(area)) if not np.isnan(area).all() else start
+        picks[i + 1] = a
+    return picks
+
+
+def to_columnar(df: pd.DataFrame, indicators: dict, decimals: int = 4) -> dict:
+    """Compact columnar JSON: one list per column, NaN as null"""
+    def column(values):
+        return [None if math.isnan(v) else v for v in np.round(values.astype(np.float64), decimals).tolist()]
+
+    columns = {name.lower(): column(df[name].to_numpy()) for name in ['Open', 'High', 'Low', 'Close', 'Volume']}
+    columns.update({name: column(values) for name, values in indicators.items()})
+    return {
+        'index': [ts.strftime('%Y-%m-%d') for ts in df.index],
+        'columns': columns,
+    }
+
+
+def indicator_columns(df: pd.DataFrame) -> dict:
+    """compute_indicators + to_columnar, as one picklable call for worker processes"""
+    return to_columnar(df, compute_indicators(df))
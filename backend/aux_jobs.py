@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+import traceback
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from aux_workers import crew_pool
+
+# Constants
+JOB_STORE = os.getenv("JOB_STORE", "memory")  # "memory" or "sqlite"
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", "data/jobs.db"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds a finished job is kept
+
+
+class JobStore(ABC):
+    """Interface for job state storage. Jobs are plain JSON-serializable dicts."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    @abstractmethod
+    def get(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def save(self, job: dict):
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def all(self):
+        ...
+
+    def update(self, job_id: str, mutate):
+        """Apply mutate(job) and save it back atomically"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            mutate(job)
+            self.save(job)
+            return job
+
+    def purge_expired(self, now: float = None):
+        """Remove finished jobs whose TTL has passed"""
+        now = now or time.time()
+        for job in self.all():
+            if job.get('expires_at') and job['expires_at'] <= now:
+                self.delete(job['id'])
+
+
+class InMemoryJobStore(JobStore):
+    """Jobs kept in process memory; lost on restart"""
+
+    def __init__(self):
+        super().__init__()
+        self._jobs = {}
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def save(self, job: dict):
+        with self._lock:
+            self._jobs[job['id']] = json.loads(json.dumps(job))
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def all(self):
+        with self._lock:
+            return [json.loads(json.dumps(job)) for job in self._jobs.values()]
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs persisted in a SQLite file so they survive restarts"""
+
+    def __init__(self, db_path: Path = JOB_DB_PATH):
+        super().__init__()
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, job: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, data, expires_at) VALUES (?, ?, ?)",
+                (job['id'], json.dumps(job), job.get('expires_at'))
+            )
+            self._conn.commit()
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def all(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM jobs").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def purge_expired(self, now: float = None):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now or time.time(),)
+            )
+            self._conn.commit()
+
+
+def create_job_store() -> JobStore:
+    """Build the job store selected by the JOB_STORE environment variable"""
+    if JOB_STORE == "sqlite":
+        return SQLiteJobStore(JOB_DB_PATH)
+    return InMemoryJobStore()
+
+
+class JobManager:
+    """
+    Runs long generations in the background and records their progress
+
+    work is a blocking callable taking a progress callback progress(task_name)
+    that must be called as each task finishes. It runs in the crew worker pool.
+    """
+
+    def __init__(self, store: JobStore, pool=crew_pool, ttl: int = JOB_RESULT_TTL):
+        self.store = store
+        self.pool = pool
+        self.ttl = ttl
+        self._running = set()
+
+    def submit(self, kind: str, endpoint: str, task_names, inputs: dict, work) -> dict:
+        """Register a job and schedule it in a pool slot reserved up front; raises PoolSaturatedError if the pool is full"""
+        # Purge first: nothing between reserving and saving may raise without releasing
+        self.store.purge_expired()
+        reservation = self.pool.reserve(endpoint)
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': 'queued',
+            'inputs': inputs,
+            'tasks': [{'name': name, 'status': 'pending', 'started_at': None, 'finished_at': None}
+                      for name in task_names],
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'duration': None,
+            'result': None,
+            'error': None,
+            'expires_at': None,
+        }
+        try:
+            self.store.save(job)
+        except Exception:
+            reservation.release()
+            raise
+
+        task = asyncio.create_task(self._run(job['id'], endpoint, work, reservation))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+        return job
+
+    def get(self, job_id: str):
+        job = self.store.get(job_id)
+        if job and job.get('expires_at') and job['expires_at'] <= time.time():
+            self.store.delete(job_id)
+            return None
+        return job
+
+    def recover(self):
+        """Mark jobs left unfinished by a previous process as failed"""
+        for job in self.store.all():
+            if job['status'] in ('queued', 'running'):
+                self.store.update(job['id'], lambda j: self._finish(j, 'failed', error="Interrupted by server restart"))
+
+    async def _run(self, job_id: str, endpoint: str, work, reservation):
+        def execute():
+            self.store.update(job_id, self._start)
+            return work(lambda name: self.store.update(job_id, lambda j: self._advance(j, name)))
+
+        try:
+            result = await self.pool.run(endpoint, execute, reservation=reservation)
+            self.store.update(job_id, lambda j: self._finish(j, 'succeeded', result=str(result)))
+        except Exception as e:
+            traceback.print_exc()
+            self.store.update(job_id, lambda j: self._finish(j, 'failed', error=str(e)))
+
+    @staticmethod
+    def _start(job):
+        now = time.time()
+        job['status'] = 'running'
+        job['started_at'] = now
+        if job['tasks']:
+            job['tasks'][0]['status'] = 'running'
+            job['tasks'][0]['started_at'] = now
+
+    @staticmethod
+    def _advance(job, task_name):
+        now = time.time()
+        tasks = job['tasks']
+        for i, task in enumerate(tasks):
+            if task['name'] == task_name and task['status'] != 'done':
+                task['status'] = 'done'
+                task['finished_at'] = now
+                if i + 1 < len(tasks):
+                    tasks[i + 1]['status'] = 'running'
+                    tasks[i + 1]['started_at'] = now
+                break
+
+    def _finish(self, job, status, result=None, error=None):
+        now = time.time()
+        job['status'] = status
+        job['finished_at'] = now
+        if job['started_at']:
+            job['duration'] = now - job['started_at']
+        job['result'] = result
+        job['error'] = error
+        job['expires_at'] = now + self.ttl
+        for task in job['tasks']:
+            if task['status'] == 'running':
+                task['status'] = 'done' if status == 'succeeded' else 'failed'
+                task['finished_at'] = now
@@ -1,21 +1,57 @@
 import os
+import re
+import json
 import arxiv
+import hashlib
+import tempfile
+import requests
 from pathlib import Path
+from collections import OrderedDict
 from PyPDF2 import PdfReader
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import shutil
+import bisect
+import threading
+
+from aux_catalog import paper_catalog, paper_record
+from aux_embeddings import get_embed_model
+from aux_vectorstore import MmapVectorStore
+from aux_bm25 import BM25Index, HybridRetriever
+from aux_sessions import chat_sessions
 
 from llama_index.core import Document, StorageContext, load_index_from_storage
-from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.openai import OpenAI
 from llama_index.core.indices.vector_store.base import VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.chat_engine import CondensePlusContextChatEngine
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.memory import ChatMemoryBuffer
+
+# Summarizing memory arrived in later llama-index releases; fall back to a plain token window
+try:
+    from llama_index.core.memory import ChatSummaryMemoryBuffer
+except ImportError:
+    ChatSummaryMemoryBuffer = None
 
 # Constants 
 OPENAI_MODEL = "gpt-4o-mini"
+RETRIEVAL_TOP_K = int(os.getenv("PAPER_RETRIEVAL_TOP_K", "2"))
+CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "3000"))
+DEFAULT_COLLECTION = "default"
+PAPER_ID_PREFIX = "arxiv:"
+COLLECTION_NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}\Z")
+INDEX_MEMORY_BUDGET = int(os.getenv("PAPER_INDEX_MEMORY_MB", "1024")) * 1024 * 1024  # bytes
 BASE_DIR = Path("data")
 DOWNLOAD_DIR = BASE_DIR / "papers"
 STORAGE_DIR = BASE_DIR / "storage"
+COLLECTIONS_DIR = BASE_DIR / "collections"
+TEXT_CACHE_DIR = BASE_DIR / "text_cache"
 CHUNK_SIZE = 3072
 CHUNK_OVERLAP = 64
+DOWNLOAD_WORKERS = int(os.getenv("ARXIV_DOWNLOAD_WORKERS", "4"))
+DOWNLOAD_TIMEOUT = int(os.getenv("ARXIV_DOWNLOAD_TIMEOUT", "60"))
+EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
 
 
 # Helper functions
@@ -24,17 +60,52 @@ def init_directories():
     DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
     STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
-def extract_text_from_pdf(pdf_path: Path) -> str:
-    """Extract text content from PDF file"""
+def extract_pages_from_pdf(pdf_path: Path) -> list:
+    """Text of each page of a PDF file, each ending with a newline"""
     try:
         reader = PdfReader(str(pdf_path))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return [(page.extract_text() or "") + "\n" for page in reader.pages]
     except Exception as e:
         print(f"Error extracting text from {pdf_path}: {str(e)}")
-        return ""
+        return []
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomic(path: Path, content: str):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_name, path)
+
+def extract_paper(pdf_path: Path) -> tuple:
+    """
+    (text, sha256, page_starts) of a PDF, through an on-disk cache keyed by the content hash
+
+    page_starts holds the character offset where each page begins in text.
+    Safe to run in worker processes; cache writes are atomic (temp + rename).
+    """
+    pdf_path = Path(pdf_path)
+    content_hash = file_sha256(pdf_path)
+    cache_path = TEXT_CACHE_DIR / f"{content_hash}.txt"
+    pages_path = TEXT_CACHE_DIR / f"{content_hash}.pages.json"
+    if cache_path.exists() and pages_path.exists():
+        return cache_path.read_text(encoding="utf-8"), content_hash, json.loads(pages_path.read_text())
+
+    pages = extract_pages_from_pdf(pdf_path)
+    text = "".join(pages)
+    page_starts = [0]
+    for page in pages[:-1]:
+        page_starts.append(page_starts[-1] + len(page))
+    if text.strip():
+        TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_atomic(cache_path, text)
+        _write_atomic(pages_path, json.dumps(page_starts))
+    return text, content_hash, page_starts
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to remove invalid characters and ensure proper path handling"""
@@ -45,3 +116,521 @@ def sanitize_filename(filename: str) -> str:
     for char in invalid_chars:
         filename = filename.replace(char, '_')
     return filename
+
+
+# PDF downloads
+
+# One keep-alive connection pool shared by every download thread
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS))
+http_session.mount("http://", HTTPAdapter(pool_connections=DOWNLOAD_WORKERS, pool_maxsize=DOWNLOAD_WORKERS))
+http_session.headers.update({"User-Agent": "LLM-Toolbox/1.0"})
+
+download_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="arxiv")
+
+# PDF parsing is CPU bound, so files are extracted in worker processes
+extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+
+
+def _manifest_path(pdf_path: Path) -> Path:
+    return pdf_path.with_name(pdf_path.name + ".json")
+
+
+def is_complete_download(pdf_path: Path) -> bool:
+    """True if the PDF was fully written by download_pdf and its size still matches"""
+    try:
+        manifest = json.loads(_manifest_path(pdf_path).read_text())
+        return pdf_path.stat().st_size == manifest['size']
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def download_pdf(url: str, pdf_path: Path) -> dict:
+    """
+    Download a PDF atomically: write to a temp file, verify, then rename
+
+    The size is checked against Content-Length and the file must start with
+    the PDF magic bytes. A manifest with size and sha256 is written next to
+    the PDF so partial files are never mistaken for complete ones.
+    """
+    # Unique temp name so two requests fetching the same paper cannot interleave writes
+    fd, tmp_name = tempfile.mkstemp(prefix=pdf_path.name + ".", suffix=".part", dir=pdf_path.parent)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with http_session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            expected = response.headers.get("Content-Length")
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+
+        if expected is not None and int(expected) != size:
+            raise IOError(f"Incomplete download: got {size} of {expected} bytes")
+        with open(tmp_path, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                raise IOError("Downloaded file is not a PDF")
+
+        os.replace(tmp_path, pdf_path)
+        manifest = {'size': size, 'sha256': digest.hexdigest(), 'url': url}
+        _manifest_path(pdf_path).write_text(json.dumps(manifest))
+        return manifest
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def fetch_paper(record: dict, download: bool = True):
+    """
+    Download one catalog record's PDF into DOWNLOAD_DIR unless already complete
+
+    With download unset, nothing is fetched and a paper not yet on disk gives None.
+    """
+    safe_filename = sanitize_filename(f"{record['arxiv_id']}.pdf")
+    pdf_path = DOWNLOAD_DIR / safe_filename
+    if not is_complete_download(pdf_path):
+        if not download:
+            return None
+        manifest = download_pdf(record['pdf_url'], pdf_path)
+        paper_catalog.set_download(record['arxiv_id'], safe_filename, str(pdf_path), manifest['sha256'])
+    elif not record.get('sha256'):
+        manifest = json.loads(_manifest_path(pdf_path).read_text())
+        paper_catalog.set_download(record['arxiv_id'], safe_filename, str(pdf_path), manifest['sha256'])
+    return {'title': record['title'], 'filename': safe_filename}
+
+
+def search_papers(query: str, max_results: int, offline: bool = False) -> list:
+    """
+    Catalog records for a search (blocking)
+
+    A repeat of a recent query is answered from the catalog; otherwise the
+    arXiv API is queried and the catalog updated. If arXiv is unreachable,
+    or offline is set, the local full-text index answers instead.
+    """
+    if not offline:
+        cached = paper_catalog.cached_query(query, max_results)
+        if cached is not None:
+            return cached
+        try:
+            search = arxiv.Search(query=query, max_results=max_results)
+            records = [paper_record(result) for result in arxiv.Client().results(search)]
+            paper_catalog.upsert(records)
+            paper_catalog.record_query(query, max_results, [r['arxiv_id'] for r in records])
+            return records
+        except Exception as e:
+            print(f"ArXiv search failed, answering from the local catalog: {str(e)}")
+    return paper_catalog.search(query, max_results)
+
+
+def resolve_paper_files(filenames, paper_ids) -> list:
+    """PDF paths for explicit filenames plus catalog lookups by arXiv id"""
+    paths = [DOWNLOAD_DIR / filename for filename in filenames]
+    for record in paper_catalog.get_many(paper_ids):
+        if record['filename']:
+            paths.append(DOWNLOAD_DIR / record['filename'])
+    return list(dict.fromkeys(paths))
+
+
+# Paper index
+
+def paper_doc_id(pdf_path: Path) -> str:
+    """Stable document id for a paper: its arXiv id without the version suffix"""
+    return PAPER_ID_PREFIX + re.sub(r"v\d+$", "", Path(pdf_path).stem)
+
+
+def paper_document(pdf_path: Path, text: str, content_hash: str, page_starts=None) -> Document:
+    """
+    Index document for one paper
+
+    The id stays the same across versions of a paper, while the content hash
+    in the metadata changes the document hash whenever the PDF changes, so
+    refresh_ref_docs re-embeds exactly the papers that changed. page_starts
+    lets a retrieved chunk be traced back to its page.
+    """
+    pdf_path = Path(pdf_path)
+    return Document(
+        id_=paper_doc_id(pdf_path),
+        text=text,
+        metadata={'arxiv_id': pdf_path.stem, 'filename': pdf_path.name, 'content_hash': content_hash,
+                  'page_starts': page_starts or [0]},
+        excluded_embed_metadata_keys=['filename', 'content_hash', 'page_starts'],
+        excluded_llm_metadata_keys=['content_hash', 'page_starts'],
+    )
+
+
+def describe_source(node_with_score) -> dict:
+    """Paper, page span and score of a retrieved chunk"""
+    node = node_with_score.node
+    metadata = node.metadata or {}
+    page_starts = metadata.get('page_starts')
+
+    def page_of(offset):
+        return bisect.bisect_right(page_starts, offset) if page_starts and offset is not None else None
+
+    record = paper_catalog.get(metadata['arxiv_id']) if metadata.get('arxiv_id') else None
+    return {
+        'paper': metadata.get('arxiv_id'),
+        'title': record['title'] if record else None,
+        'page': page_of(node.start_char_idx),
+        'last_page': page_of(node.end_char_idx - 1 if node.end_char_idx else None),
+        'score': node_with_score.score,
+    }
+
+
+# Collections
+
+_collection_locks = {}
+_collection_file_locks = {}
+_collection_locks_guard = threading.Lock()
+
+
+def collection_dir(collection: str = DEFAULT_COLLECTION) -> Path:
+    """Storage directory of a collection; the default one keeps STORAGE_DIR"""
+    if collection == DEFAULT_COLLECTION:
+        return STORAGE_DIR
+    if not COLLECTION_NAME_PATTERN.fullmatch(collection):
+        raise ValueError(f"Invalid collection name: {collection}")
+    return COLLECTIONS_DIR / collection
+
+
+def collection_exists(collection: str) -> bool:
+    return collection == DEFAULT_COLLECTION or collection_dir(collection).is_dir()
+
+
+def collection_lock(collection: str) -> threading.Lock:
+    """Serializes read-modify-persist cycles on one collection"""
+    with _collection_locks_guard:
+        return _collection_locks.setdefault(collection, threading.Lock())
+
+
+def collection_files_lock(collection: str) -> threading.Lock:
+    """
+    Held while a collection's index files are written or read back
+
+    The llama-index stores rewrite their JSON files in place, so a load must
+    never overlap a persist. Only held for the disk I/O itself; take it
+    after collection_lock, never before.
+    """
+    with _collection_locks_guard:
+        return _collection_file_locks.setdefault(collection, threading.Lock())
+
+
+def storage_size(storage_dir: Path) -> int:
+    """Bytes on disk of a persisted index, used as its memory estimate"""
+    try:
+        return sum(path.stat().st_size for path in Path(storage_dir).iterdir() if path.is_file())
+    except OSError:
+        return 0
+
+
+def list_collections() -> list:
+    names = [DEFAULT_COLLECTION]
+    if COLLECTIONS_DIR.is_dir():
+        names += sorted(path.name for path in COLLECTIONS_DIR.iterdir() if path.is_dir())
+    loaded = paper_index_cache.loaded()
+    return [
+        {
+            'name': name,
+            'indexed': (collection_dir(name) / "docstore.json").exists(),
+            'size_bytes': storage_size(collection_dir(name)),
+            'loaded': name in loaded,
+        }
+        for name in names
+    ]
+
+
+def create_collection(collection: str):
+    """Create an empty collection; FileExistsError if it already exists"""
+    if collection_exists(collection):
+        raise FileExistsError(f"Collection {collection} already exists")
+    collection_dir(collection).mkdir(parents=True)
+
+
+def delete_collection(collection: str):
+    """Drop a collection and its persisted index (not the default one)"""
+    if collection == DEFAULT_COLLECTION:
+        raise ValueError("The default collection cannot be deleted")
+    if not collection_exists(collection):
+        raise FileNotFoundError(f"Collection {collection} does not exist")
+    with collection_lock(collection), collection_files_lock(collection):
+        paper_index_cache.invalidate(collection)
+        shutil.rmtree(collection_dir(collection))
+
+
+# Paper index lifecycle
+
+def load_paper_index(embed_model=None, create: bool = False, storage_dir: Path = STORAGE_DIR):
+    """Persisted index from storage_dir, or a new empty one if create is set"""
+    embed_model = embed_model or get_embed_model()
+    transformations = [SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)]
+    if (storage_dir / "docstore.json").exists():
+        storage_context = StorageContext.from_defaults(
+            persist_dir=str(storage_dir), vector_store=MmapVectorStore.from_persist_dir(storage_dir)
+        )
+        return load_index_from_storage(storage_context, embed_model=embed_model, transformations=transformations)
+    if not create:
+        raise FileNotFoundError("No paper index has been created yet")
+    storage_context = StorageContext.from_defaults(vector_store=MmapVectorStore())
+    return VectorStoreIndex([], storage_context=storage_context, embed_model=embed_model,
+                            transformations=transformations)
+
+
+def index_generation(storage_dir: Path = STORAGE_DIR) -> int:
+    """
+    Version counter of a persisted index
+
+    Bumped by every persist once all index files are written, so a reader
+    never takes a half-written index for a new generation.
+    """
+    try:
+        return int((storage_dir / "generation").read_text())
+    except (OSError, ValueError):
+        return 0
+
+
+def build_keyword_index(index, previous: BM25Index = None) -> BM25Index:
+    """BM25 index over the text of every chunk in the paper index, tokenizing only chunks previous lacks"""
+    node_ids = list(index.index_struct.nodes_dict)
+    if previous is not None:
+        # Chunk ids are random, so a re-embedded paper shows up as removed and added ids
+        known = set(previous.node_ids)
+        added = [node_id for node_id in node_ids if node_id not in known]
+        nodes = index.docstore.get_nodes(added) if added else []
+        return previous.update(known.difference(node_ids),
+                               ((node.node_id, node.get_content()) for node in nodes))
+    nodes = index.docstore.get_nodes(node_ids) if node_ids else []
+    return BM25Index.build((node.node_id, node.get_content()) for node in nodes)
+
+
+def load_keyword_index(index, storage_dir: Path = STORAGE_DIR) -> BM25Index:
+    """Persisted BM25 index, built from the docstore if the index predates it"""
+    return BM25Index.from_persist_dir(storage_dir) or build_keyword_index(index)
+
+
+def persist_paper_index(index, collection: str = DEFAULT_COLLECTION):
+    """Persist the index and its BM25 index as a new generation (call under collection_lock)"""
+    storage_dir = collection_dir(collection)
+    # Writers all hold collection_lock, so the persisted BM25 index matches the last generation
+    keyword_index = build_keyword_index(index, BM25Index.from_persist_dir(storage_dir))
+    with collection_files_lock(collection):
+        index.storage_context.persist(persist_dir=str(storage_dir))
+        keyword_index.persist(storage_dir)
+        # Written last: readers only pick up the new files once the counter moves
+        generation = index_generation(storage_dir) + 1
+        tmp_path = storage_dir / "generation.tmp"
+        tmp_path.write_text(str(generation))
+        os.replace(tmp_path, storage_dir / "generation")
+    paper_index_cache.put(collection, generation, index, keyword_index)
+
+
+class PaperIndexCache:
+    """
+    Process-wide handle on loaded collections: each paper index with its BM25 index
+
+    A collection is loaded on first use and kept until its persisted
+    generation changes. A reload builds the new pair aside and swaps the
+    reference, so requests already holding the previous pair finish against
+    it. Once the loaded collections exceed memory_budget (estimated from
+    their size on disk), the least recently used ones are dropped.
+    on_drop(collection, generation) is called whenever a loaded pair is
+    dropped or replaced, with the generation now loaded (None if none), so
+    holders of the old index can let go of it.
+    """
+
+    def __init__(self, memory_budget: int = INDEX_MEMORY_BUDGET, on_drop=None):
+        self.memory_budget = memory_budget
+        self.on_drop = on_drop
+        self._entries = OrderedDict()  # collection -> (generation, index, keyword_index, size)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, collection: str = DEFAULT_COLLECTION) -> tuple:
+        """(index, keyword_index, generation) of a collection, reloaded if its generation changed (blocking)"""
+        storage_dir = collection_dir(collection)
+        found = self._lookup(collection, index_generation(storage_dir))
+        if found is not None:
+            return found
+        with self._lock:
+            load_lock = self._load_locks.setdefault(collection, threading.Lock())
+        with load_lock:
+            # The files lock keeps a persist from rewriting the files mid-load
+            with collection_files_lock(collection):
+                # Another request may have finished the reload while we waited
+                generation = index_generation(storage_dir)
+                found = self._lookup(collection, generation)
+                if found is not None:
+                    return found
+                index = load_paper_index(storage_dir=storage_dir)
+                keyword_index = load_keyword_index(index, storage_dir)
+            self.put(collection, generation, index, keyword_index)
+            return index, keyword_index, generation
+
+    def _lookup(self, collection, generation):
+        with self._lock:
+            entry = self._entries.get(collection)
+            if entry is None or entry[0] != generation:
+                return None
+            self._entries.move_to_end(collection)
+            return entry[1], entry[2], entry[0]
+
+    def put(self, collection, generation, index, keyword_index):
+        size = storage_size(collection_dir(collection))
+        dropped = []
+        with self._lock:
+            previous = self._entries.get(collection)
+            if previous is not None and previous[0] != generation:
+                dropped.append((collection, generation))
+            self._entries[collection] = (generation, index, keyword_index, size)
+            self._entries.move_to_end(collection)
+            # Never evict the collection just stored, even if it alone exceeds the budget
+            while len(self._entries) > 1 and sum(entry[3] for entry in self._entries.values()) > self.memory_budget:
+                evicted, _ = self._entries.popitem(last=False)
+                dropped.append((evicted, None))
+        self._notify(dropped)
+
+    def loaded(self) -> dict:
+        """Loaded collections and their estimated sizes, least recently used first"""
+        with self._lock:
+            return {collection: entry[3] for collection, entry in self._entries.items()}
+
+    def invalidate(self, collection: str = None):
+        """Drop one loaded collection, or all of them"""
+        with self._lock:
+            if collection is None:
+                dropped = list(self._entries)
+                self._entries.clear()
+            else:
+                dropped = [collection] if self._entries.pop(collection, None) is not None else []
+        self._notify([(name, None) for name in dropped])
+
+    def _notify(self, dropped):
+        if self.on_drop is not None:
+            for collection, generation in dropped:
+                self.on_drop(collection, generation)
+
+
+# Chat sessions keep an engine over the index; release it when the index goes
+paper_index_cache = PaperIndexCache(on_drop=chat_sessions.drop_engines)
+
+
+def chat_memory():
+    """Token-bounded chat memory; older turns are summarized once history exceeds CHAT_MEMORY_TOKENS"""
+    if ChatSummaryMemoryBuffer is not None:
+        return ChatSummaryMemoryBuffer.from_defaults(llm=OpenAI(model=OPENAI_MODEL), token_limit=CHAT_MEMORY_TOKENS)
+    return ChatMemoryBuffer.from_defaults(token_limit=CHAT_MEMORY_TOKENS)
+
+
+def paper_chat_engine(index, keyword_index, retrieval_mode: str = "hybrid", memory=None):
+    """condense_plus_context chat engine over the papers with the given retrieval mode"""
+    retriever = HybridRetriever(index, keyword_index, mode=retrieval_mode, top_k=RETRIEVAL_TOP_K)
+    return CondensePlusContextChatEngine.from_defaults(
+        retriever=retriever,
+        llm=OpenAI(model=OPENAI_MODEL),
+        memory=memory,
+        verbose=True,
+    )
+
+
+def session_chat_engine(session, retrieval_mode: str, collection: str = DEFAULT_COLLECTION):
+    """
+    The session's chat engine, rebuilt only when the index or retrieval mode changed
+
+    A rebuilt engine keeps the session memory, so the conversation survives
+    a new index generation or a switch of collection. Call with session.lock held.
+    """
+    index, keyword_index, generation = paper_index_cache.get(collection)
+    # A token, not the index itself, so an evicted index is not kept alive by the key
+    key = (collection, generation, retrieval_mode)
+    engine = session.engine
+    if engine is None or session.engine_key != key:
+        engine = paper_chat_engine(index, keyword_index, retrieval_mode, memory=session.memory)
+        session.engine, session.engine_key = engine, key
+    return engine
+
+
+def session_chat(session, query: str, retrieval_mode: str, collection: str = DEFAULT_COLLECTION):
+    """One chat turn in a session (blocking)"""
+    with session.lock:
+        return session_chat_engine(session, retrieval_mode, collection).chat(query)
+
+
+def session_stream_chat(session, query: str, retrieval_mode: str, emit, cancelled,
+                        collection: str = DEFAULT_COLLECTION):
+    """
+    One streamed chat turn in a session (blocking)
+
+    emit(event, data) receives a "sources" event once retrieval is done and
+    before generation starts, then one "token" event per token. Setting the
+    cancelled event stops emitting; the answer is still completed into the
+    session memory so the conversation stays consistent.
+    """
+    with session.lock:
+        response = session_chat_engine(session, retrieval_mode, collection).stream_chat(query)
+        emit("sources", {'sources': [describe_source(node) for node in response.source_nodes]})
+        for token in response.response_gen:
+            if cancelled.is_set():
+                break
+            emit("token", {'text': token})
+        # The engine writes the answer to memory in its own thread; finish before the next turn
+        writer = getattr(response, 'write_response_to_history_thread', None)
+        if writer is not None:
+            writer.join()
+
+
+def update_paper_index(documents, embed_model, collection: str = DEFAULT_COLLECTION) -> dict:
+    """
+    Insert new papers and re-embed changed ones in a collection's index (blocking)
+
+    Papers whose document hash is unchanged are skipped without any
+    embedding calls. The update runs on a fresh copy loaded from disk, so
+    the cached index serving chat requests is never mutated in place.
+    Documents left by indexes built before stable paper ids carry random
+    ids and no metadata to trace them to a PDF, so they are removed rather
+    than kept as duplicates. Returns the ids that were refreshed, skipped
+    and removed as legacy.
+    """
+    with collection_lock(collection):
+        # Checked under the lock so a concurrent delete_collection cannot be undone by the persist
+        if not collection_exists(collection):
+            raise FileNotFoundError(f"Collection {collection} does not exist")
+        index = load_paper_index(embed_model, create=True, storage_dir=collection_dir(collection))
+        legacy = [doc_id for doc_id in (index.docstore.get_all_ref_doc_info() or {})
+                  if not doc_id.startswith(PAPER_ID_PREFIX)]
+        for doc_id in legacy:
+            index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        refreshed = index.refresh_ref_docs(documents)
+        if legacy or any(refreshed):
+            persist_paper_index(index, collection)
+    return {
+        'refreshed': [doc.id_ for doc, changed in zip(documents, refreshed) if changed],
+        'unchanged': [doc.id_ for doc, changed in zip(documents, refreshed) if not changed],
+        'removed_legacy': legacy,
+    }
+
+
+def delete_paper_from_index(doc_id: str, collection: str = DEFAULT_COLLECTION) -> bool:
+    """Remove one paper and its chunks from a collection's index (blocking)"""
+    with collection_lock(collection):
+        index = load_paper_index(storage_dir=collection_dir(collection))
+        if index.docstore.get_ref_doc_info(doc_id) is None:
+            return False
+        index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        persist_paper_index(index, collection)
+    return True
+
+
+def indexed_papers(collection: str = DEFAULT_COLLECTION) -> list:
+    """Ids and metadata of the papers in a collection's index"""
+    storage_dir = collection_dir(collection)
+    with collection_files_lock(collection):
+        if not (storage_dir / "docstore.json").exists():
+            return []
+        docstore = SimpleDocumentStore.from_persist_dir(str(storage_dir))
+    return [
+        {'doc_id': doc_id, **(info.metadata or {})}
+        for doc_id, info in (docstore.get_all_ref_doc_info() or {}).items()
+    ]
@@ -0,0 +1,89 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+# Constants
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", "1800"))  # seconds idle before eviction
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "100"))
+
+
+class ChatSession:
+    """Server-side state of one conversation: its chat engine and memory"""
+
+    def __init__(self, session_id: str, memory):
+        self.session_id = session_id
+        self.memory = memory
+        self.engine = None
+        self.engine_key = None  # (collection, generation, retrieval mode) the engine was built for
+        self.last_used = time.time()
+        # One turn at a time per conversation; the memory is not safe to share
+        self.lock = threading.Lock()
+
+
+class ChatSessionStore:
+    """
+    Bounded table of live chat sessions
+
+    Sessions idle longer than ttl are dropped on access, and once
+    max_sessions is reached the least recently used session is evicted.
+    """
+
+    def __init__(self, ttl: float = CHAT_SESSION_TTL, max_sessions: int = CHAT_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id, new_memory) -> ChatSession:
+        """
+        The live session for session_id, or a new one
+
+        A new session always gets a fresh server-generated id, even when the
+        client sent an unknown or expired one, so clients cannot pick ids.
+        """
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(uuid.uuid4().hex, new_memory())
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session.session_id)
+            session.last_used = now
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def drop_engines(self, collection: str, keep_generation=None):
+        """
+        Forget the engines built over a collection, except those on keep_generation
+
+        Engines hold the loaded index; dropping them lets an evicted or
+        replaced index be freed. The next turn of the session rebuilds its engine.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            key = session.engine_key
+            if key is not None and key[0] == collection and key[1] != keep_generation:
+                session.engine = None
+                session.engine_key = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict_idle(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+
+
+chat_sessions = ChatSessionStore()
@@ -0,0 +1,106 @@
+import json
+import time
+import asyncio
+import contextvars
+
+# Token chunks are only published by the crewai event bus (crewai >= 0.102).
+# On older versions the stream still carries task, tool and result events.
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:
+    try:
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        crewai_event_bus = None
+
+# Stream owning the crew running in the current worker thread
+_active_stream = contextvars.ContextVar("active_crew_stream", default=None)
+
+_DONE = object()
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class CrewEventStream:
+    """
+    Bridges callbacks fired by a crew in a worker thread to an SSE generator
+
+    Task and tool events come from the task/step callbacks of a crew copy.
+    LLM tokens are forwarded only while the last task of the crew is running.
+    """
+
+    def __init__(self, loop, task_names):
+        self.loop = loop
+        self.task_names = list(task_names)
+        self.current = 0
+        self.queue = asyncio.Queue()
+
+    def emit(self, event: str, data):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn in the worker thread with this stream registered for token events"""
+        token = _active_stream.set(self)
+        try:
+            self.emit("task_start", {'task': self.task_names[0], 'time': time.time()})
+            return fn(*args, **kwargs)
+        finally:
+            _active_stream.reset(token)
+
+    def on_task_done(self, name, output):
+        self.emit("task_end", {'task': name, 'time': time.time(), 'output': str(output)})
+        self.current += 1
+        if self.current < len(self.task_names):
+            self.emit("task_start", {'task': self.task_names[self.current], 'time': time.time()})
+
+    def on_step(self, step):
+        tool = getattr(step, 'tool', None)
+        if tool:
+            self.emit("tool", {
+                'task': self.task_names[min(self.current, len(self.task_names) - 1)],
+                'tool': tool,
+                'input': getattr(step, 'tool_input', None),
+            })
+
+    def on_token(self, chunk: str):
+        if chunk and self.current == len(self.task_names) - 1:
+            self.emit("token", {'text': chunk})
+
+    def finish(self, result):
+        self.emit("result", {'message': str(result)})
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, _DONE)
+
+    def fail(self, error: Exception):
+        self.emit("error", {'detail': str(error)})
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, _DONE)
+
+    async def events(self, runner):
+        """
+        Yield SSE frames while the runner coroutine (or task) drives the crew
+
+        Closing the generator cancels the runner; the crew thread itself keeps
+        its pool slot until it returns.
+        """
+        task = asyncio.ensure_future(runner)
+        try:
+            yield sse_event("start", {'tasks': self.task_names, 'time': time.time()})
+            while True:
+                item = await self.queue.get()
+                if item is _DONE:
+                    break
+                event, data = item
+                yield sse_event(event, data)
+        finally:
+            if not task.done():
+                task.cancel()
+
+
+if crewai_event_bus is not None:
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _forward_stream_chunk(source, event):
+        stream = _active_stream.get()
+        if stream is not None and not getattr(event, 'tool_call', None):
+            stream.on_token(event.chunk)
@@ -0,0 +1,203 @@
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+from pydantic import PrivateAttr
+
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+
+# Constants
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")  # float32, float16 or int8
+VECTOR_FILE = "vectors.npy"
+VECTOR_SCALE_FILE = "vector_scales.npy"
+VECTOR_IDS_FILE = "vector_ids.json"
+LEGACY_VECTOR_FILE = "default__vector_store.json"
+QUERY_BLOCK_ROWS = 65536  # rows upcast to float32 at a time when scoring
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _atomic_save(path: Path, array: np.ndarray):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    Vector store keeping embeddings as one contiguous matrix on disk
+
+    Vectors are L2-normalized on insert, so cosine similarity is a single
+    matrix-vector product; top-k is taken with argpartition. The matrix is
+    saved as .npy and memory-mapped on load. float16 halves its size and
+    int8 stores one scale per row for a quarter of the float32 size.
+    Node ids and their ref doc ids live in a small JSON table. Text stays
+    in the docstore, as with the default store.
+    """
+
+    stores_text: bool = False
+    dtype: str = VECTOR_STORE_DTYPE
+
+    _ids: list = PrivateAttr(default_factory=list)
+    _ref_ids: list = PrivateAttr(default_factory=list)
+    _matrix: np.ndarray = PrivateAttr(default=None)
+    _scales: np.ndarray = PrivateAttr(default=None)
+    _rows: dict = PrivateAttr(default=None)
+
+    def __init__(self, dtype: str = VECTOR_STORE_DTYPE, **kwargs):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        super().__init__(dtype=dtype, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self):
+        return None
+
+    @property
+    def node_count(self) -> int:
+        # Not __len__: llama_index tests stores for truthiness and would drop an empty one
+        return len(self._ids)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir, dtype: str = VECTOR_STORE_DTYPE) -> "MmapVectorStore":
+        """Memory-map a persisted store, importing a default JSON vector store if that is all there is"""
+        persist_dir = Path(persist_dir)
+        store = cls(dtype=dtype)
+        ids_path = persist_dir / VECTOR_IDS_FILE
+        if ids_path.exists():
+            table = json.loads(ids_path.read_text())
+            store.dtype = table['dtype']
+            store._ids = table['ids']
+            store._ref_ids = table['ref_doc_ids']
+            if store._ids:
+                store._matrix = np.load(persist_dir / VECTOR_FILE, mmap_mode="r")
+                if store.dtype == "int8":
+                    store._scales = np.load(persist_dir / VECTOR_SCALE_FILE, mmap_mode="r")
+        elif (persist_dir / LEGACY_VECTOR_FILE).exists():
+            data = json.loads((persist_dir / LEGACY_VECTOR_FILE).read_text())
+            embeddings = data.get('embedding_dict', {})
+            if embeddings:
+                ids = list(embeddings)
+                ref_ids = data.get('text_id_to_ref_doc_id', {})
+                store._append(ids, [ref_ids.get(node_id) for node_id in ids],
+                              np.array([embeddings[node_id] for node_id in ids], dtype=np.float32))
+        return store
+
+    def _encode(self, vectors: np.ndarray):
+        """Normalized vectors in the storage dtype, plus per-row scales for int8"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.dtype), None
+
+    def _append(self, ids, ref_ids, vectors: np.ndarray):
+        encoded, scales = self._encode(vectors)
+        if self._matrix is None or not len(self._ids):
+            self._matrix, self._scales = encoded, scales
+        else:
+            if encoded.shape[1] != self._matrix.shape[1]:
+                raise ValueError(f"Embedding dimension {encoded.shape[1]} does not match store dimension {self._matrix.shape[1]}")
+            self._matrix = np.concatenate([self._matrix, encoded])
+            if scales is not None:
+                self._scales = np.concatenate([self._scales, scales])
+        self._ids = self._ids + list(ids)
+        self._ref_ids = self._ref_ids + list(ref_ids)
+        self._rows = None
+
+    def _keep(self, keep: np.ndarray):
+        self._matrix = self._matrix[keep] if self._matrix is not None else None
+        if self._scales is not None:
+            self._scales = self._scales[keep]
+        self._ids = [node_id for node_id, k in zip(self._ids, keep) if k]
+        self._ref_ids = [ref_id for ref_id, k in zip(self._ref_ids, keep) if k]
+        self._rows = None
+
+    def add(self, nodes, **add_kwargs) -> list:
+        if not nodes:
+            return []
+        ids = [node.node_id for node in nodes]
+        self._append(ids, [node.ref_doc_id for node in nodes],
+                     np.array([node.get_embedding() for node in nodes], dtype=np.float32))
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs) -> None:
+        """Delete every vector of one source document"""
+        self._keep(np.array([ref_id != ref_doc_id for ref_id in self._ref_ids], dtype=bool))
+
+    def delete_nodes(self, node_ids=None, filters=None, **delete_kwargs) -> None:
+        if filters is not None:
+            raise ValueError("Metadata filters are not supported by MmapVectorStore")
+        drop = set(node_ids or [])
+        self._keep(np.array([node_id not in drop for node_id in self._ids], dtype=bool))
+
+    def clear(self) -> None:
+        self._ids, self._ref_ids = [], []
+        self._matrix = self._scales = self._rows = None
+
+    def _scores(self, rows, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against the given rows, in blocks"""
+        scores = np.empty(len(rows) if rows is not None else len(self._ids), dtype=np.float32)
+        for start in range(0, len(scores), QUERY_BLOCK_ROWS):
+            index = slice(start, start + QUERY_BLOCK_ROWS) if rows is None else rows[start:start + QUERY_BLOCK_ROWS]
+            block = self._matrix[index].astype(np.float32, copy=False) @ query
+            if self._scales is not None:
+                block *= self._scales[index]
+            scores[start:start + len(block)] = block
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise ValueError("Metadata filters are not supported by MmapVectorStore")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"Unsupported query mode: {query.mode}")
+        if not self._ids or query.query_embedding is None:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        rows = None
+        if query.node_ids is not None:
+            if self._rows is None:
+                self._rows = {node_id: row for row, node_id in enumerate(self._ids)}
+            rows = np.array(sorted(self._rows[n] for n in query.node_ids if n in self._rows), dtype=np.int64)
+            if not len(rows):
+                return VectorStoreQueryResult(similarities=[], ids=[])
+
+        scores = self._scores(rows, _normalize(np.asarray(query.query_embedding, dtype=np.float32)))
+        k = min(query.similarity_top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if rows is None else rows[top]
+        return VectorStoreQueryResult(
+            similarities=scores[top].tolist(),
+            ids=[self._ids[i] for i in positions],
+        )
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        """Write the matrix and id table into the directory of persist_path"""
+        persist_dir = Path(persist_path).parent
+        persist_dir.mkdir(parents=True, exist_ok=True)
+        if self._ids:
+            _atomic_save(persist_dir / VECTOR_FILE, np.ascontiguousarray(self._matrix))
+            if self._scales is not None:
+                _atomic_save(persist_dir / VECTOR_SCALE_FILE, np.ascontiguousarray(self._scales))
+        table = {'dtype': self.dtype, 'ids': self._ids, 'ref_doc_ids': self._ref_ids}
+        tmp_path = persist_dir / (VECTOR_IDS_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(table))
+        os.replace(tmp_path, persist_dir / VECTOR_IDS_FILE)
+        # A default JSON store left from before is now stale
+        (persist_dir / LEGACY_VECTOR_FILE).unlink(missing_ok=True)
@@ -0,0 +1,155 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Constants
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "8"))
+CREW_MAX_QUEUE = int(os.getenv("CREW_MAX_QUEUE", "32"))
+CREW_ENDPOINT_QUEUE = int(os.getenv("CREW_ENDPOINT_QUEUE", "8"))
+
+# Default number of simultaneous kickoffs per endpoint.
+# Override with CREW_LIMIT_<ENDPOINT>, e.g. CREW_LIMIT_BLOG_REQUEST=2
+CREW_ENDPOINT_LIMITS = {
+    'blog_request': 4,
+    'posts_request': 4,
+    'images_request': 4,
+    'latest_news': 2,
+    'fundamental_analysis': 2,
+    'screener': 2,
+}
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a crew run cannot be queued"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int = 5):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Lane:
+    """Concurrency slot and queue accounting for a single endpoint"""
+
+    def __init__(self, limit: int, queue_limit: int):
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.running = 0
+        self.waiting = 0
+
+
+class _Reservation:
+    """A queued place in a lane, held from submission until the run starts"""
+
+    def __init__(self, pool, lane: _Lane):
+        self.pool = pool
+        self.lane = lane
+        self.active = True
+
+    def release(self):
+        """Give the place back if the run never started; safe to call more than once"""
+        if self.active:
+            self.active = False
+            self.lane.waiting -= 1
+            self.pool._pending -= 1
+
+
+class CrewWorkerPool:
+    """
+    Bounded thread pool that runs blocking Crew.kickoff calls off the event loop
+
+    Every endpoint gets its own lane with a concurrency limit and a queue
+    limit. A full endpoint queue is rejected with 429, a full pool with 503.
+    A slot stays taken until the worker thread returns, even if the caller
+    stops waiting. All accounting happens on the event loop thread, so no
+    locking is needed.
+    """
+
+    def __init__(self, max_workers=CREW_POOL_SIZE, max_queue=CREW_MAX_QUEUE,
+                 endpoint_limits=None, endpoint_queue=CREW_ENDPOINT_QUEUE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.endpoint_limits = dict(endpoint_limits or CREW_ENDPOINT_LIMITS)
+        self.endpoint_queue = endpoint_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew")
+        self._lanes = {}
+        self._pending = 0
+
+    def _lane(self, endpoint: str) -> _Lane:
+        lane = self._lanes.get(endpoint)
+        if lane is None:
+            default = self.endpoint_limits.get(endpoint, self.max_workers)
+            limit = int(os.getenv(f"CREW_LIMIT_{endpoint.upper()}", default))
+            lane = _Lane(max(1, min(limit, self.max_workers)), self.endpoint_queue)
+            self._lanes[endpoint] = lane
+        return lane
+
+    def check_capacity(self, endpoint: str):
+        """Raise PoolSaturatedError if a new run for endpoint would be rejected"""
+        lane = self._lane(endpoint)
+        if self._pending >= self.max_workers + self.max_queue:
+            raise PoolSaturatedError("Server is busy, please retry later", status_code=503)
+        if lane.running >= lane.limit and lane.waiting >= lane.queue_limit:
+            raise PoolSaturatedError(f"Too many pending '{endpoint}' requests", status_code=429)
+
+    def reserve(self, endpoint: str) -> _Reservation:
+        """Queue a run for endpoint now, raising PoolSaturatedError if it would be rejected"""
+        self.check_capacity(endpoint)
+        lane = self._lane(endpoint)
+        self._pending += 1
+        lane.waiting += 1
+        return _Reservation(self, lane)
+
+    async def run(self, endpoint: str, fn, *args, reservation: _Reservation = None, **kwargs):
+        """Run fn(*args, **kwargs) in the pool under the endpoint's limits, using reservation if given"""
+        if reservation is None:
+            reservation = self.reserve(endpoint)
+        lane = reservation.lane
+        try:
+            await lane.semaphore.acquire()
+        except BaseException:
+            reservation.release()
+            raise
+        if not reservation.active:
+            # Released by its owner while queued: the counts were already given back
+            lane.semaphore.release()
+            raise asyncio.CancelledError("Reservation was released before the run started")
+
+        reservation.active = False
+        lane.waiting -= 1
+        lane.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._finished(lane)
+            raise
+        # Released when the thread is done, not when the caller stops awaiting
+        future.add_done_callback(lambda _: self._finished(lane))
+        return await asyncio.shield(future)
+
+    def _finished(self, lane: _Lane):
+        lane.running -= 1
+        lane.semaphore.release()
+        self._pending -= 1
+
+    def stats(self) -> dict:
+        """Snapshot of pool and per-endpoint utilisation"""
+        return {
+            'pool_size': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'endpoints': {
+                name: {'limit': lane.limit, 'running': lane.running,
+                       'waiting': lane.waiting, 'queue_limit': lane.queue_limit}
+                for name, lane in self._lanes.items()
+            },
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+crew_pool = CrewWorkerPool()
@@ -1,13 +1,16 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, field_validator
+from fastapi import FastAPI, HTTPException, Header, Response
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Dict, Optional, Any, Optional
 import json
 from enum import Enum
 from datetime import datetime
 import os
+import asyncio
+import threading
+import base64
 import uuid
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import re
 from pathlib import Path
 import pandas as pd
@@ -17,11 +20,17 @@ import traceback
 import logging
 
 import yfinance as yf
-import pandas_ta as ta
-import matplotlib.pyplot as plt
 
 from aux_crewai import *
 from aux_scientific import *
+from aux_workers import *
+from aux_jobs import *
+from aux_streaming import *
+from aux_cache import *
+from aux_finance import *
+from aux_indicators import *
+from aux_embeddings import *
+from aux_sessions import *
 
 
 
@@ -71,6 +80,15 @@ class ImageRequest(BaseModel):
 class ImageResponse(BaseModel):
     message: str
 
+class BundleRequest(BaseModel):
+    content: str
+
+class BundleResponse(BaseModel):
+    research: str
+    blog: str
+    posts: str
+    images: str
+
 
 # Mount the images directory to make it accessible via HTTP
 #app.mount("/images", StaticFiles(directory="images"), name="images")
@@ -79,6 +97,7 @@ class ImageResponse(BaseModel):
 class ArxivSearchRequest(BaseModel):
     query: str
     max_results: int = 10
+    offline: bool = False  # answer from the local catalog only, returning papers already downloaded
 
 class PaperInfo(BaseModel):
     title: str
@@ -88,13 +107,40 @@ class PaperSearchResponse(BaseModel):
     papers: List[PaperInfo]
 
 class PaperProcessRequest(BaseModel):
-    filenames: List[str]
+    filenames: List[str] = []
+    paper_ids: List[str] = []  # arXiv ids looked up in the local catalog
+    collection: str = DEFAULT_COLLECTION
+
+class CollectionRequest(BaseModel):
+    name: str
+
+class CatalogPaper(BaseModel):
+    arxiv_id: str
+    title: Optional[str] = None
+    authors: List[str] = []
+    abstract: Optional[str] = None
+    categories: List[str] = []
+    published: Optional[str] = None
+    filename: Optional[str] = None
+    sha256: Optional[str] = None
+
+class CatalogSearchResponse(BaseModel):
+    papers: List[CatalogPaper]
+
+class RetrievalMode(str, Enum):
+    HYBRID = "hybrid"
+    VECTOR = "vector"
+    KEYWORD = "keyword"  # BM25 only, no embedding call
 
 class ChatRequest(BaseModel):
     query: str
+    retrieval_mode: RetrievalMode = RetrievalMode.HYBRID
+    session_id: Optional[str] = None  # omitted, unknown or expired: a new session with a new id is started
+    collection: str = DEFAULT_COLLECTION
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: Optional[str] = None
 
 # Request and Response Models
 class NewsRequest(BaseModel):
@@ -110,12 +156,69 @@ class FundamentalResponse(BaseModel):
     analysis: str  # This is the required field
 
 
+class JobRequest(BaseModel):
+    content: str
+
+class JobTaskInfo(BaseModel):
+    name: str
+    status: str
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    tasks: List[JobTaskInfo]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    duration: Optional[float] = None
+    result: Optional[str] = None
+    error: Optional[str] = None
+    expires_at: Optional[float] = None
+
+
 class Period(str, Enum):
+    ONE_DAY = "1day"
+    FIVE_DAYS = "5days"
+    ONE_MONTH = "1month"
+    THREE_MONTHS = "3months"
+    SIX_MONTHS = "6months"
+    YEAR_TO_DATE = "ytd"
     ONE_YEAR = "1year"
+    TWO_YEARS = "2years"
+    FIVE_YEARS = "5years"
+    TEN_YEARS = "10years"
+    MAX = "max"
+
+# Period -> yfinance period string
+YF_PERIODS = {
+    Period.ONE_DAY: '1d',
+    Period.FIVE_DAYS: '5d',
+    Period.ONE_MONTH: '1mo',
+    Period.THREE_MONTHS: '3mo',
+    Period.SIX_MONTHS: '6mo',
+    Period.YEAR_TO_DATE: 'ytd',
+    Period.ONE_YEAR: '1y',
+    Period.TWO_YEARS: '2y',
+    Period.FIVE_YEARS: '5y',
+    Period.TEN_YEARS: '10y',
+    Period.MAX: 'max',
+}
+
+class ChartFormat(str, Enum):
+    PNG = "png"
+    WEBP = "webp"
+    SVG = "svg"
 
 class ChartRequest(BaseModel):
     ticker: str
     period: Period = Period.ONE_YEAR
+    width: float = Field(15, ge=2, le=30)   # inches
+    height: float = Field(10, ge=2, le=30)  # inches
+    dpi: int = Field(300, ge=50, le=300)
+    format: ChartFormat = ChartFormat.PNG
     
     @field_validator('ticker')
     def validate_ticker(cls, v):
@@ -124,6 +227,68 @@ class ChartRequest(BaseModel):
             raise ValueError("Ticker symbol cannot be empty")
         return v
 
+class PrewarmRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=500)
+
+class RangeFilter(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ScreenerRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=1000)
+    filters: Dict[str, RangeFilter] = {}
+    sort_by: str = "market_cap"
+    descending: bool = True
+    page: int = Field(1, ge=1)
+    page_size: int = Field(50, ge=1, le=500)
+    commentary_top_n: int = Field(0, ge=0, le=20)  # 0 = no LLM commentary
+
+class ScreenerResponse(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    results: List[Dict[str, Any]]
+    errors: Dict[str, str]
+    commentary: Optional[str] = None
+
+class IndicatorRequest(BaseModel):
+    ticker: str
+    period: Period = Period.ONE_YEAR
+
+    @field_validator('ticker')
+    def validate_ticker(cls, v):
+        v = v.strip().upper()
+        if not v:
+            raise ValueError("Ticker symbol cannot be empty")
+        return v
+
+class IndicatorResponse(BaseModel):
+    ticker: str
+    period: str
+    index: List[str]
+    columns: Dict[str, List[Optional[float]]]
+
+class BatchMode(str, Enum):
+    INDICATORS = "indicators"
+    CHART = "chart"
+    BOTH = "both"
+
+class BatchRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=100)
+    period: Period = Period.ONE_YEAR
+    mode: BatchMode = BatchMode.INDICATORS
+    width: float = Field(15, ge=2, le=30)
+    height: float = Field(10, ge=2, le=30)
+    dpi: int = Field(100, ge=50, le=300)
+    format: ChartFormat = ChartFormat.PNG
+
+    @field_validator('tickers')
+    def validate_tickers(cls, v):
+        v = [t.strip().upper() for t in v if t.strip()]
+        if not v:
+            raise ValueError("Ticker list cannot be empty")
+        return list(dict.fromkeys(v))
+
 class ChartResponse(BaseModel):
     success: bool
     message: str
@@ -131,88 +296,96 @@ class ChartResponse(BaseModel):
     error: Optional[str] = None
 
 
-def generate_ta_chart(ticker, period='1y', save_path='charts'):
+async def run_crew(endpoint: str, crew, inputs: dict):
+    """Kick off a crew in the worker pool, translating saturation into 429/503"""
+    try:
+        return await crew_pool.run(endpoint, crew.kickoff, inputs=inputs)
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def normalize_subject(subject: str) -> str:
+    return " ".join(subject.split()).casefold()
+
+
+async def cached_crew(endpoint: str, pipeline: str, subject: str, option: int,
+                      response: Response, cache_control: Optional[str] = None):
     """
-    Generate and save a technical analysis chart with MACD and Moving Averages
-    
-    Parameters:
-    ticker (str): Stock ticker symbol
-    period (str): Valid periods: 1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max
-    save_path (str): Directory to save the chart
-    
-    Returns:
-    bool: True if successful, False if there was an error
+    Run a crew through the result cache
+
+    Identical requests in flight share a single kickoff. A Cache-Control:
+    no-cache request header skips the cached result and regenerates it.
     """
-    # Validate period
-    valid_periods = ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']
-    if period not in valid_periods:
-        print(f"Invalid period. Please use one of: {', '.join(valid_periods)}")
-        return False
-    
+    key = hash_key(endpoint, normalize_subject(subject),
+                   crew_registry.provider(pipeline, option), CONFIG_HASH)
+    no_cache = cache_control is not None and 'no-cache' in cache_control.lower()
+
+    if not no_cache:
+        cached = result_cache.get(key)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            return cached
+
+    async def generate():
+        crew = crew_registry.get(pipeline, option)
+        result = str(await run_crew(endpoint, crew, {CREW_INPUTS[pipeline]: subject}))
+        result_cache.set(key, result)
+        return result
+
+    response.headers["X-Cache"] = "COALESCED" if result_flights.in_flight(key) else "MISS"
+    return await result_flights.do(key, generate)
+
+
+async def stream_crew(endpoint: str, pipeline: str, inputs: dict, option: int = 1):
+    """Run a crew in the worker pool and stream its progress as server-sent events"""
     try:
-        # Get data from yfinance
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period)
-        
-        if df.empty:
-            print(f"No data found for ticker {ticker}")
-            return False
-        
-        # Calculate indicators
-        df['MA50'] = df['Close'].rolling(window=50).mean()
-        df['MA200'] = df['Close'].rolling(window=200).mean()
-        
-        # Calculate MACD
-        macd = ta.macd(df['Close'])
-        df = df.join(macd)
-        
-        # Create figure with subplots
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10), height_ratios=[2, 1])
-        fig.suptitle(f'{ticker} Technical Analysis Chart', fontsize=16)
-        
-        # Plot price and MAs
-        ax1.plot(df.index, df['Close'], label='Price', color='black', alpha=0.7)
-        ax1.plot(df.index, df['MA50'], label='50 MA', color='blue', alpha=0.7)
-        ax1.plot(df.index, df['MA200'], label='200 MA', color='red', alpha=0.7)
-        ax1.set_title('Price and Moving Averages')
-        ax1.set_ylabel('Price')
-        ax1.grid(True, alpha=0.3)
-        ax1.legend()
-        
-        # Plot MACD
-        ax2.plot(df.index, df['MACD_12_26_9'], label='MACD', color='blue')
-        ax2.plot(df.index, df['MACDs_12_26_9'], label='Signal', color='red')
-        ax2.bar(df.index, df['MACDh_12_26_9'], label='Histogram', 
-                color=df['MACDh_12_26_9'].apply(lambda x: 'green' if x >= 0 else 'red'),
-                alpha=0.5)
-        ax2.set_title('MACD')
-        ax2.set_ylabel('MACD')
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
-        
-        # Adjust layout
-        plt.tight_layout()
-        
-        # Create directory if it doesn't exist
-        if not os.path.exists(save_path):
-            os.makedirs(save_path)
-        
-        # Save chart
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{save_path}/{ticker}_{period}_{timestamp}.png"
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
-        
-        
-        print(f"Chart saved successfully as {filename}")
-        return True
-        
-    except Exception as e:
-        print(f"Error generating chart: {str(e)}")
-        return False
-    
+        reservation = crew_pool.reserve(endpoint)
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    stream = CrewEventStream(asyncio.get_running_loop(), CREW_PIPELINES[pipeline])
+
+    async def runner():
+        try:
+            crew = crew_registry.get(pipeline, option)
+            attach_task_callback(crew, pipeline, stream.on_task_done)
+            attach_step_callback(crew, stream.on_step)
+            stream_final_task(crew)
+            result = await crew_pool.run(endpoint, stream.run, crew.kickoff, inputs=inputs,
+                                         reservation=reservation)
+            stream.finish(result)
+        except Exception as e:
+            logging.error(f"Streaming {pipeline} error: {e}")
+            stream.fail(e)
+        finally:
+            reservation.release()
+
+    # Started now so the reservation is settled even if the response is never iterated
+    task = asyncio.create_task(runner())
+
+    async def frames():
+        try:
+            async for frame in stream.events(task):
+                yield frame
+        finally:
+            # The runner may be cancelled before it ever starts
+            reservation.release()
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
-    
 @app.post("/model_def", response_model=ModResponse)
 async def chat(request: ModRequest):
 
@@ -252,58 +425,18 @@ async def chat(request: ModRequest):
     
 
 @app.post("/blog_request", response_model=BlogResponse)
-async def process_blog_request(request: BlogRequest):
+async def process_blog_request(request: BlogRequest, response: Response,
+                               cache_control: Optional[str] = Header(None)):
     try:
-        if  app.state.option == 1:
-            blog_content_creation_crew = Crew(
-                agents=[
-                web_search_agent,
-                blog_content_creator_agent
-
-                ],
-                tasks=[
-                blog_find_data_task,
-                blog_create_content_task
-                ],
-                process=Process.sequential,
-                verbose=True
-            )
-
-            result = blog_content_creation_crew.kickoff(inputs={
-                'subject': f'{request.content}'
-                })
-
-            # Convert Markdown to HTML
-
-            print(result)
-
-            return BlogResponse(message=str(result))
-        else:
-            blog_content_creation_crew = Crew(
-                agents=[
-                web_search_agent_groq,
-                blog_content_creator_agent
-
-                ],
-                tasks=[
-                blog_find_data_task,
-                blog_create_content_task
-                ],
-                process=Process.sequential,
-                verbose=True
-            )
+        result = await cached_crew("blog_request", 'blog', request.content,
+                                   app.state.option, response, cache_control)
 
-            result = blog_content_creation_crew.kickoff(inputs={
-                'subject': f'{request.content}'
-                })
+        print(result)
 
-            # Convert Markdown to HTML
+        return BlogResponse(message=result)
 
-            print(result)
-
-            return BlogResponse(message=str(result))
-            pass
-    
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         logging.error(f"Blog generation error: {e}")
@@ -312,58 +445,19 @@ async def process_blog_request(request: BlogRequest):
 
 
 @app.post("/posts_request", response_model=PostResponse)
-async def process_blog_request(request: PostRequest):
+async def process_blog_request(request: PostRequest, response: Response,
+                               cache_control: Optional[str] = Header(None)):
     try:
-        
-        if  app.state.option == 1:
-            post_content_creation_crew = Crew(
-                agents=[
-                web_search_agent,
-                post_content_creator_agent
-
-                ],
-                tasks=[
-                social_find_data_task,
-                social_create_content_task
-                ],
-                process=Process.sequential,
-                verbose=True
-            )
+        # With the Groq option the web search runs on Llama 3
+        result = await cached_crew("posts_request", 'posts', request.content,
+                                   app.state.option, response, cache_control)
 
-            result = post_content_creation_crew.kickoff(inputs={
-                'subject': f'{request.content}'
-                })
+        print(result)
 
-            
-
-            print(result)
-
-            return PostResponse(message=str(result))
-        else:
-            post_content_creation_crew = Crew(
-                agents=[
-                web_search_agent_groq,  # This crew uses groq for web search 
-                post_content_creator_agent
-
-                ],
-                tasks=[
-                social_find_data_task,
-                social_create_content_task
-                ],
-                process=Process.sequential,
-                verbose=True
-            )
-
-            result = post_content_creation_crew.kickoff(inputs={
-                'subject': f'{request.content}'
-                })
-
-
-            print(result)
-
-            return PostResponse(message=str(result))
-        
+        return PostResponse(message=result)
     
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         logging.error(f"Blog generation error: {e}")
@@ -371,104 +465,242 @@ async def process_blog_request(request: PostRequest):
     
 
 
+@app.post("/blog_request/stream")
+async def stream_blog_request(request: BlogRequest):
+    return await stream_crew("blog_request", 'blog', {'subject': request.content}, app.state.option)
+
+
+@app.post("/posts_request/stream")
+async def stream_posts_request(request: PostRequest):
+    return await stream_crew("posts_request", 'posts', {'subject': request.content}, app.state.option)
 
 
     
-@app.post("/arxiv/search", response_model=PaperSearchResponse)
-async def search_arxiv(request: ArxivSearchRequest):
-    """Search ArXiv and download papers"""
+async def fetch_papers(query: str, max_results: int, offline: bool = False):
+    """
+    Search arXiv and download the results concurrently, yielding (rank, PaperInfo) as each completes
+
+    Offline, nothing is downloaded: only results whose PDF is already on disk are yielded.
+    """
     init_directories()
-    
-    search = arxiv.Search(
-        query=request.query,
-        max_results=request.max_results
-    )
-    
-    downloaded_papers = []
-    
-    for paper in arxiv.Client().results(search):
+    loop = asyncio.get_running_loop()
+    papers = await loop.run_in_executor(None, search_papers, query, max_results, offline)
+
+    async def fetch(position, paper):
+        return position, await asyncio.wrap_future(download_pool.submit(fetch_paper, paper, not offline))
+
+    for next_done in asyncio.as_completed([fetch(i, paper) for i, paper in enumerate(papers)]):
         try:
-            # Create a sanitized filename from the ArXiv ID
-            safe_filename = sanitize_filename(f"{paper.get_short_id()}.pdf")
-            pdf_path = DOWNLOAD_DIR / safe_filename
-            
-            if not pdf_path.exists():  # Only download if file doesn't exist
-                paper.download_pdf(dirpath=str(DOWNLOAD_DIR), filename=safe_filename)
-            
-            downloaded_papers.append(PaperInfo(
-                title=paper.title,
-                filename=safe_filename
-            ))
+            position, info = await next_done
+            if info is not None:
+                yield position, PaperInfo(**info)
         except Exception as e:
-            print(f"Failed to download {paper.title}: {str(e)}")
-            continue
-    
-    return PaperSearchResponse(papers=downloaded_papers)
+            print(f"Failed to download paper: {str(e)}")
+
+
+@app.post("/arxiv/search", response_model=PaperSearchResponse)
+async def search_arxiv(request: ArxivSearchRequest):
+    """Search ArXiv and download papers"""
+    downloaded_papers = [item async for item in fetch_papers(request.query, request.max_results, request.offline)]
+    # Keep arXiv's relevance order
+    downloaded_papers.sort(key=lambda item: item[0])
+    return PaperSearchResponse(papers=[paper for _, paper in downloaded_papers])
+
+
+@app.post("/arxiv/search/stream")
+async def search_arxiv_stream(request: ArxivSearchRequest):
+    """Search ArXiv and stream each PaperInfo as NDJSON as soon as its PDF is on disk"""
+    async def lines():
+        async for _, paper in fetch_papers(request.query, request.max_results, request.offline):
+            yield paper.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/arxiv/catalog/search", response_model=CatalogSearchResponse)
+async def search_catalog(q: str, limit: int = 20):
+    """Full-text search of the local paper catalog, no network involved"""
+    papers = await asyncio.get_running_loop().run_in_executor(None, paper_catalog.search, q, limit)
+    return CatalogSearchResponse(papers=[CatalogPaper(**paper) for paper in papers])
+
+
+@app.get("/arxiv/catalog/{arxiv_id}", response_model=CatalogPaper)
+async def get_catalog_paper(arxiv_id: str):
+    paper = paper_catalog.get(arxiv_id)
+    if paper is None:
+        raise HTTPException(status_code=404, detail="Paper not in catalog")
+    return CatalogPaper(**paper)
+
+
+def collection_storage(collection: str) -> Path:
+    """Storage directory of an existing collection, with 400/404 for bad or unknown names"""
+    try:
+        exists = collection_exists(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not exists:
+        raise HTTPException(status_code=404, detail=f"Collection {collection} does not exist")
+    return collection_dir(collection)
+
+@app.post("/arxiv/collections")
+async def create_paper_collection(request: CollectionRequest):
+    """Create an empty named paper collection"""
+    try:
+        create_collection(request.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "success", "collection": request.name}
+
+@app.get("/arxiv/collections")
+async def list_paper_collections():
+    """Collections with their size on disk and whether they are loaded in memory"""
+    return {"collections": list_collections()}
+
+@app.delete("/arxiv/collections/{name}")
+async def delete_paper_collection(name: str):
+    """Delete a collection and its index"""
+    collection_storage(name)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, delete_collection, name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "deleted": name}
 
 @app.post("/arxiv/process_papers")
 async def process_papers(request: PaperProcessRequest):
-    """Process selected papers and create vector index"""
-    pdf_files = [DOWNLOAD_DIR / filename for filename in request.filenames]
+    """Add selected papers to a collection's vector index, re-embedding only new or changed ones"""
+    collection_storage(request.collection)
+    pdf_files = resolve_paper_files(request.filenames, request.paper_ids)
     
-    # Directly configure models without Settings class
-    openai_llm = OpenAI(model=OPENAI_MODEL)
-    embed_model = OpenAIEmbedding()
+    # Cached embedding model: only chunks never embedded before reach the backend
+    embed_model = get_embed_model()
     
+    # Extract all files in parallel worker processes, reusing cached text
+    loop = asyncio.get_running_loop()
+    extracted = await asyncio.gather(
+        *[loop.run_in_executor(extraction_pool, extract_paper, pdf_path) for pdf_path in pdf_files],
+        return_exceptions=True
+    )
+
     # Load and process documents
     documents = []
     
-    for pdf_path in pdf_files:
-        try:
-            text = extract_text_from_pdf(pdf_path)
-            if text.strip():  # Only add if we got some text
-                documents.append(Document(text=text))
-        except Exception as e:
-            print(f"Error processing {pdf_path}: {str(e)}")
+    for pdf_path, result in zip(pdf_files, extracted):
+        if isinstance(result, Exception):
+            print(f"Error processing {pdf_path}: {str(result)}")
+            continue
+        text, content_hash, page_starts = result
+        if text.strip():  # Only add if we got some text
+            documents.append(paper_document(pdf_path, text, content_hash, page_starts))
     
     if not documents:
         raise HTTPException(status_code=400, detail="No documents were successfully processed!")
     
-    # Create and persist index
+    # Update the persisted index in place
     try:
-        index = VectorStoreIndex.from_documents(
-            documents,
-            llm=openai_llm,
-            embed_model=embed_model,
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
+        summary = await loop.run_in_executor(None, update_paper_index, documents, embed_model, request.collection)
+        return {
+            "status": "success",
+            "message": f"Index updated: {len(summary['refreshed'])} papers embedded, {len(summary['unchanged'])} unchanged, {len(summary['removed_legacy'])} legacy documents removed",
+            **summary,
+        }
+    except FileNotFoundError as e:
+        # Collection deleted while its papers were being extracted
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating index: {str(e)}")
+
+@app.get("/arxiv/index/papers")
+async def list_indexed_papers(collection: str = DEFAULT_COLLECTION):
+    """Papers currently in a collection's vector index"""
+    collection_storage(collection)
+    return {"papers": indexed_papers(collection)}
+
+@app.delete("/arxiv/index/papers/{arxiv_id}")
+async def delete_indexed_paper(arxiv_id: str, collection: str = DEFAULT_COLLECTION):
+    """Remove one paper and its chunks from a collection's vector index"""
+    if not (collection_storage(collection) / "docstore.json").exists():
+        raise HTTPException(status_code=404, detail="No index available")
+    doc_id = paper_doc_id(Path(sanitize_filename(f"{arxiv_id}.pdf")))
+    try:
+        deleted = await asyncio.get_running_loop().run_in_executor(
+            None, delete_paper_from_index, doc_id, collection
         )
-        
-        # Save index to disk
-        index.storage_context.persist(persist_dir=str(STORAGE_DIR))
-        return {"status": "success", "message": "Index created successfully"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error creating index: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error updating index: {str(e)}")
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Paper {arxiv_id} is not in the index")
+    return {"status": "success", "deleted": doc_id}
 
 @app.post("/arxiv/chat", response_model=ChatResponse)
 async def chat_with_papers(request: ChatRequest):
-    """Chat with processed papers"""
+    """Chat with processed papers, continuing the conversation of request.session_id"""
+    if not (collection_storage(request.collection) / "docstore.json").exists():
+        raise HTTPException(status_code=404, detail="No index available, process some papers first")
     try:
-        # Load existing index from disk
-        storage_context = StorageContext.from_defaults(persist_dir=str(STORAGE_DIR))
-        index = load_index_from_storage(storage_context)
-        
-        # Create chat engine
-        chat_engine = index.as_chat_engine(
-            #chat_mode="condense_question",
-            chat_mode="condense_plus_context",
-            verbose=True
+        # Sessions keep their chat engine and memory warm between turns
+        session = chat_sessions.get_or_create(request.session_id, chat_memory)
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, session_chat, session, request.query, request.retrieval_mode.value, request.collection
         )
-        
-        # Generate response
-        response = chat_engine.chat(request.query)
-        return ChatResponse(response=response.response)
+        return ChatResponse(response=response.response, session_id=session.session_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error chatting with papers: {str(e)}")
 
+@app.post("/arxiv/chat/stream")
+async def chat_with_papers_stream(request: ChatRequest):
+    """Chat with processed papers as server-sent events: start, sources, token..., done"""
+    if not (collection_storage(request.collection) / "docstore.json").exists():
+        raise HTTPException(status_code=404, detail="No index available, process some papers first")
+
+    session = chat_sessions.get_or_create(request.session_id, chat_memory)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    def run():
+        try:
+            session_stream_chat(session, request.query, request.retrieval_mode.value, emit, cancelled,
+                                request.collection)
+            emit("done", {'session_id': session.session_id})
+        except Exception as e:
+            logging.error(f"Streaming chat error: {e}")
+            emit("error", {'detail': str(e)})
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def events():
+        loop.run_in_executor(None, run)
+        try:
+            yield sse_event("start", {'session_id': session.session_id})
+            while (item := await queue.get()) is not None:
+                yield sse_event(*item)
+        finally:
+            # Client went away: stop forwarding tokens
+            cancelled.set()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/arxiv/chat/sessions/{session_id}")
+async def end_chat_session(session_id: str):
+    """Drop a chat session and its memory"""
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"status": "success"}
+
 @app.get("/arxiv/existing_index")
-async def check_existing_index():
+async def check_existing_index(collection: str = DEFAULT_COLLECTION):
     """Check if an existing index is available"""
-    index_exists = (STORAGE_DIR / "docstore.json").exists()
+    index_exists = (collection_storage(collection) / "docstore.json").exists()
     return {"index_exists": index_exists}
 
 
@@ -479,14 +711,10 @@ async def process_blog_request(request: ImageRequest):
         print("Images Requested")
         
         # Create the crew
-        image_crew = Crew(
-            agents=[image_searcher],
-            tasks=[search_task],
-            verbose=True
-        )
+        image_crew = crew_registry.get('images')
 
         # Run the crew with the specific subject
-        result = image_crew.kickoff(inputs={
+        result = await run_crew("images_request", image_crew, {
             'context': f'{request.content}'
         })
 
@@ -494,12 +722,44 @@ async def process_blog_request(request: ImageRequest):
 
         return ImageResponse(message=str(result))
     
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         logging.error(f"Blog generation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.post("/images_request/stream")
+async def stream_images_request(request: ImageRequest):
+    return await stream_crew("images_request", 'images', {'context': request.content})
+
+
+@app.post("/content_bundle", response_model=BundleResponse)
+async def process_content_bundle(request: BundleRequest, response: Response,
+                                 cache_control: Optional[str] = Header(None)):
+    """Research a subject once, then write the blog, the posts and find images in parallel"""
+    try:
+        option = app.state.option
+        research = await cached_crew("content_bundle", 'research', request.content,
+                                     option, response, cache_control)
+
+        inputs = {'subject': request.content, 'research': research}
+        blog, posts, images = await asyncio.gather(
+            run_crew("blog_request", crew_registry.get('bundle_blog', option), inputs),
+            run_crew("posts_request", crew_registry.get('bundle_posts', option), inputs),
+            run_crew("images_request", crew_registry.get('images'), {'context': request.content}),
+        )
+
+        return BundleResponse(research=research, blog=str(blog), posts=str(posts), images=str(images))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        logging.error(f"Content bundle error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -510,29 +770,18 @@ async def get_latest_news(request: NewsRequest):
     try:
         logger.info(f"Received news request for: {request.sector_or_country}")
         
-        financial_news_crew = Crew(
-            agents=[
-                financial_search_agent,
-                financial_content_creator_agent
-            ],
-            tasks=[
-                financial_find_news_task,
-                financial_create_content_task
-            ],
-            process=Process.sequential,
-            verbose=True
-        )
+        financial_news_crew = crew_registry.get('latest_news')
 
         # Just pass the user's input directly to the crew
-        result = financial_news_crew.kickoff(
-            inputs={
-                'subject': request.sector_or_country
-            }
-        )
+        result = await run_crew("latest_news", financial_news_crew, {
+            'subject': request.sector_or_country
+        })
 
         logger.info("Successfully generated news content")
         return NewsResponse(news=str(result))
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating news: {str(e)}")
         traceback.print_exc()
@@ -546,20 +795,15 @@ async def get_latest_news(request: FundamentalRequest):
     try:
         logger.info(f"Received analysis request for: {request.ticker}")
        
-        fundamental_crew = Crew(
-            agents=[stock_researcher, stock_analyst],
-            tasks=[stock_research_task, stock_analysis_task],
-            process=Process.sequential,
-            verbose=True
-        )
+        fundamental_crew = crew_registry.get('fundamental_analysis')
         
-        result = fundamental_crew.kickoff(
-            inputs={
-                'ticker': request.ticker
-            }
-        )
+        result = await run_crew("fundamental_analysis", fundamental_crew, {
+            'ticker': request.ticker
+        })
         logger.info("Successfully generated analysis")
         return FundamentalResponse(analysis=str(result))  # Changed from news to analysis
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating analysis: {str(e)}")
         traceback.print_exc()
@@ -570,48 +814,107 @@ async def get_latest_news(request: FundamentalRequest):
 
 
 
-@app.post("/api/generate-chart", response_model=ChartResponse)
-async def generate_chart(request: ChartRequest):
+@app.post("/latest_news/stream")
+async def stream_latest_news(request: NewsRequest):
+    return await stream_crew("latest_news", 'latest_news', {'subject': request.sector_or_country})
+
+
+@app.post("/fundamental_analysis/stream")
+async def stream_fundamental_analysis(request: FundamentalRequest):
+    return await stream_crew("fundamental_analysis", 'fundamental_analysis', {'ticker': request.ticker})
+
+
+# Background jobs: crew pipeline -> worker pool lane
+JOB_ENDPOINTS = {
+    'blog': 'blog_request',
+    'posts': 'posts_request',
+    'images': 'images_request',
+    'latest_news': 'latest_news',
+    'fundamental_analysis': 'fundamental_analysis',
+}
+
+job_manager = JobManager(create_job_store())
+
+
+@app.post("/jobs/{kind}", response_model=JobResponse, status_code=202)
+async def submit_job(kind: str, request: JobRequest):
+    """Start a crew run in the background and return its job id immediately"""
+    if kind not in JOB_ENDPOINTS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind: {kind}")
+
+    option = app.state.option
+    inputs = {CREW_INPUTS[kind]: request.content}
+
+    def work(progress):
+        crew = attach_task_callback(crew_registry.get(kind, option), kind,
+                                    lambda name, output: progress(name))
+        return crew.kickoff(inputs=inputs)
+
+    try:
+        job = job_manager.submit(kind, JOB_ENDPOINTS[kind], CREW_PIPELINES[kind], inputs, work)
+    except PoolSaturatedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return JobResponse(**job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Return status, per-task progress, timing and result of a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return JobResponse(**job)
+
+
+
+async def render_chart_cached(key: str, df, ticker: str, width: float, height: float,
+                              dpi: int, fmt: str) -> bytes:
+    """Chart bytes from the chart cache, rendering in the process pool on a miss"""
+    async def render():
+        image = chart_cache.get(key)
+        if image is None:
+            image = await asyncio.get_running_loop().run_in_executor(
+                chart_pool, render_ta_chart, df, ticker, width, height, dpi, fmt
+            )
+            chart_cache.set(key, image)
+        return image
+
+    return await chart_flights.do(key, render)
+
+
+async def chart_response(request: ChartRequest, if_none_match: Optional[str] = None):
+    """Render (or fetch from the chart cache) a chart, answering 304 when the client copy is current"""
     try:
-        temp_dir = "temp_charts"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        # Clean up old files
-        for old_file in os.listdir(temp_dir):
-            file_path = os.path.join(temp_dir, old_file)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        
-        # Convert '1year' to '1y' for yfinance
-        yf_period = '1y'
-        
-        # Generate chart
-        success = generate_ta_chart(request.ticker, yf_period, save_path=temp_dir)
-        
-        if not success:
+        yf_period = YF_PERIODS[request.period]
+
+        loop = asyncio.get_running_loop()
+        df = await loop.run_in_executor(None, price_store.history, request.ticker, yf_period)
+
+        if df.empty:
             return ChartResponse(
                 success=False,
                 message="Failed to generate chart",
-                error="Chart generation failed"
+                error=f"No data found for ticker {request.ticker}"
             )
-        
-        # Get the latest file
-        files = os.listdir(temp_dir)
-        if not files:
-            return ChartResponse(
-                success=False,
-                message="Chart file not found",
-                error="No output file generated"
-            )
-        
-        latest_file = max([os.path.join(temp_dir, f) for f in files], key=os.path.getctime)
-        
-        return FileResponse(
-            latest_file,
-            media_type="image/png",
-            filename=f"{request.ticker}_chart.png"
-        )
+
+        fmt = request.format.value
+        key = chart_cache_key(request.ticker, yf_period, df,
+                              request.width, request.height, request.dpi, fmt)
+        etag = f'"{key[:32]}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+
+        image = await render_chart_cached(key, df, request.ticker, request.width,
+                                          request.height, request.dpi, fmt)
+
+        headers["Content-Disposition"] = f'attachment; filename="{request.ticker}_chart.{fmt}"'
+        return Response(content=image, media_type=CHART_FORMATS[fmt], headers=headers)
         
     except Exception as e:
         return ChartResponse(
@@ -621,6 +924,140 @@ async def generate_chart(request: ChartRequest):
         )
 
 
+@app.post("/api/generate-chart")
+async def generate_chart(request: ChartRequest, if_none_match: Optional[str] = Header(None)):
+    return await chart_response(request, if_none_match)
+
+
+@app.get("/api/chart/{ticker}")
+async def get_chart(ticker: str, period: Period = Period.ONE_YEAR, width: float = 15,
+                    height: float = 10, dpi: int = 300, format: ChartFormat = ChartFormat.PNG,
+                    if_none_match: Optional[str] = Header(None)):
+    """GET form of /api/generate-chart so browsers revalidate charts with If-None-Match"""
+    try:
+        request = ChartRequest(ticker=ticker, period=period, width=width,
+                               height=height, dpi=dpi, format=format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await chart_response(request, if_none_match)
+
+
+@app.post("/api/indicators", response_model=IndicatorResponse)
+async def get_indicators(request: IndicatorRequest):
+    """Price history plus SMA/EMA/MACD/RSI/Bollinger/ATR as columnar JSON"""
+    yf_period = YF_PERIODS[request.period]
+
+    loop = asyncio.get_running_loop()
+    df = await loop.run_in_executor(None, price_store.history, request.ticker, yf_period)
+    if df.empty:
+        raise HTTPException(status_code=404, detail=f"No data found for ticker {request.ticker}")
+
+    # CPU bound on long histories: keep it off the event loop, like /api/batch
+    columns = await loop.run_in_executor(chart_pool, indicator_columns, df)
+    return IndicatorResponse(ticker=request.ticker, period=request.period.value, **columns)
+
+
+@app.post("/api/batch")
+async def batch_charts(request: BatchRequest):
+    """
+    Indicators and/or charts for many tickers, streamed as NDJSON lines
+
+    Histories are refreshed with bulk downloads; each ticker's line is sent
+    as soon as its indicators and chart are ready, in completion order.
+    """
+    yf_period = YF_PERIODS[request.period]
+    loop = asyncio.get_running_loop()
+    frames = await loop.run_in_executor(None, price_store.history_many, request.tickers, yf_period)
+    fmt = request.format.value
+
+    async def build(ticker):
+        df = frames.get(ticker)
+        if df is None or df.empty:
+            return {'ticker': ticker, 'error': f"No data found for ticker {ticker}"}
+        try:
+            item = {'ticker': ticker}
+            if request.mode in (BatchMode.INDICATORS, BatchMode.BOTH):
+                item['indicators'] = await loop.run_in_executor(chart_pool, indicator_columns, df)
+            if request.mode in (BatchMode.CHART, BatchMode.BOTH):
+                key = chart_cache_key(ticker, yf_period, df, request.width,
+                                      request.height, request.dpi, fmt)
+                image = await render_chart_cached(key, df, ticker, request.width,
+                                                  request.height, request.dpi, fmt)
+                item['etag'] = f'"{key[:32]}"'
+                item['media_type'] = CHART_FORMATS[fmt]
+                item['image'] = base64.b64encode(image).decode('ascii')
+            return item
+        except Exception as e:
+            return {'ticker': ticker, 'error': str(e)}
+
+    async def lines():
+        for next_item in asyncio.as_completed([build(ticker) for ticker in request.tickers]):
+            yield json.dumps(await next_item) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/fundamentals/prewarm")
+async def prewarm_fundamentals(request: PrewarmRequest):
+    """Load fundamentals for a watchlist into the cache in the background"""
+    tickers = [t.strip().upper() for t in request.tickers if t.strip()]
+    asyncio.get_running_loop().run_in_executor(None, fundamentals_cache.prewarm, tickers)
+    return {"status": "accepted", "tickers": tickers}
+
+
+@app.post("/screener", response_model=ScreenerResponse)
+async def run_screener(request: ScreenerRequest):
+    """Rank a universe of tickers on fundamental ratios, optionally with LLM commentary"""
+    tickers = list(dict.fromkeys(t.strip().upper() for t in request.tickers if t.strip()))
+
+    loop = asyncio.get_running_loop()
+    data, errors = await loop.run_in_executor(None, fetch_fundamentals_many, tickers)
+    if not data:
+        raise HTTPException(status_code=502, detail="No fundamentals could be fetched")
+
+    df = await loop.run_in_executor(None, screen_fundamentals, data)
+
+    unknown = [column for column in [request.sort_by, *request.filters] if column not in df.columns]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown screener columns: {', '.join(unknown)}")
+    text_filters = [column for column in request.filters if column in SCREENER_TEXT_COLUMNS]
+    if text_filters:
+        raise HTTPException(status_code=422, detail=f"Range filters need numeric columns: {', '.join(text_filters)}")
+
+    mask = pd.Series(True, index=df.index)
+    for column, bounds in request.filters.items():
+        if bounds.min is not None:
+            mask &= df[column] >= bounds.min
+        if bounds.max is not None:
+            mask &= df[column] <= bounds.max
+    df = df[mask].sort_values(request.sort_by, ascending=not request.descending, na_position='last')
+
+    ranked = df.reset_index()
+    records = ranked.astype(object).where(ranked.notna(), None).to_dict(orient='records')
+    start = (request.page - 1) * request.page_size
+
+    commentary = None
+    if request.commentary_top_n and records:
+        top = json.dumps(records[:request.commentary_top_n], default=str)
+        result = await run_crew("screener", crew_registry.get('screener_commentary'), {'screen': top})
+        commentary = str(result)
+
+    return ScreenerResponse(
+        total=len(records),
+        page=request.page,
+        page_size=request.page_size,
+        results=records[start:start + request.page_size],
+        errors=errors,
+        commentary=commentary
+    )
+
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """Report crew worker pool utilisation"""
+    return crew_pool.stats()
+
+
 @app.on_event("startup")
 async def startup_event():
     
@@ -629,11 +1066,25 @@ async def startup_event():
         print("Api Up and Running")
         app.state.option = 1 # OpenAI by default
         print('Default LLM - OpenAI')
+        crew_registry.build_all()
+        if FUNDAMENTALS_WATCHLIST:
+            # Warm the fundamentals cache in the background; startup does not wait for it
+            asyncio.get_running_loop().run_in_executor(None, fundamentals_cache.prewarm, FUNDAMENTALS_WATCHLIST)
+        job_manager.recover()
 
     except Exception as e:
         print(f"Error loading initial model: {str(e)}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    crew_pool.shutdown()
+    chart_pool.shutdown(wait=False, cancel_futures=True)
+    screener_pool.shutdown(wait=False, cancel_futures=True)
+    download_pool.shutdown(wait=False, cancel_futures=True)
+    extraction_pool.shutdown(wait=False, cancel_futures=True)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Modules create their stores under data/ relative to the working directory
+# at import time; keep those out of the source tree and off the network
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
+os.environ.setdefault("EMBED_BACKEND", "local")
+os.environ.setdefault("EMBED_CACHE_DIR", "")
+
+
+@pytest.fixture
+def backend_dir():
+    return BACKEND_DIR
@@ -0,0 +1,50 @@
+from aux_bm25 import BM25Index, tokenize, reciprocal_rank_fusion
+
+NODES = [
+    ("a", "Attention is all you need: the transformer architecture"),
+    ("b", "Deep residual learning with resnet50 for image recognition"),
+    ("c", "Transformer models scale; attention heads and gpt-4 evaluation"),
+]
+
+
+def test_tokenize_keeps_technical_tokens():
+    assert tokenize("GPT-4 beats ResNet50, v1.5 and l2_norm") == ["gpt-4", "beats", "resnet50", "v1.5", "and", "l2_norm"]
+
+
+def test_search_ranks_matching_nodes():
+    index = BM25Index.build(NODES)
+    hits = index.search("attention transformer", 3)
+    assert {node_id for node_id, _ in hits} == {"a", "c"}
+    assert hits[0][1] >= hits[1][1]
+    assert index.search("resnet50", 3)[0][0] == "b"
+    assert index.search("unrelated words", 3) == []
+
+
+def test_search_respects_top_k():
+    index = BM25Index.build(NODES)
+    assert len(index.search("attention transformer resnet50", 1)) == 1
+
+
+def test_persist_round_trip(tmp_path):
+    index = BM25Index.build(NODES)
+    index.persist(tmp_path)
+    loaded = BM25Index.from_persist_dir(tmp_path)
+    assert loaded.search("attention transformer", 3) == index.search("attention transformer", 3)
+    assert BM25Index.from_persist_dir(tmp_path / "missing") is None
+
+
+def test_update_matches_a_full_rebuild():
+    added = [("d", "Vision transformer: an image is worth 16x16 words"), ("e", "")]
+    updated = BM25Index.build(NODES).update({"b"}, added)
+    rebuilt = BM25Index.build([NODES[0], NODES[2]] + added)
+    assert sorted(updated.node_ids) == sorted(rebuilt.node_ids)
+    assert "resnet50" not in updated.vocab
+    for query in ("attention transformer", "image words", "resnet50", "gpt-4"):
+        assert sorted(updated.search(query, 5)) == sorted(rebuilt.search(query, 5))
+    assert BM25Index.build([]).update([], NODES).search("resnet50", 1)[0][0] == "b"
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]])
+    assert [node_id for node_id, _ in fused][:2] in (["a", "b"], ["b", "a"])
+    assert fused[-1][0] in ("c", "d")
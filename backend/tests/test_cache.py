@@ -0,0 +1,73 @@
+import asyncio
+
+from aux_cache import TTLCache, SingleFlight, hash_key
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("aux_cache.time.time", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 61
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_disk_tier_survives_memory_eviction(tmp_path):
+    cache = TTLCache(max_entries=1, ttl=60, disk_dir=tmp_path, disk_max_entries=10)
+    cache.set("a", {'value': 1})
+    cache.set("b", {'value': 2})
+    assert cache.get("a") == {'value': 1}
+    assert TTLCache(max_entries=1, ttl=60, disk_dir=tmp_path).get("b") == {'value': 2}
+
+
+def test_hash_key_is_stable():
+    assert hash_key('chart', 'AAPL', 1) == hash_key('chart', 'AAPL', 1)
+    assert hash_key('chart', 'AAPL', 1) != hash_key('chart', 'AAPL', 2)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*[flights.do("key", fetch) for _ in range(5)])
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+        assert not flights.in_flight("key")
+
+    asyncio.run(scenario())
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "result"
+
+    asyncio.run(scenario())
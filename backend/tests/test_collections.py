@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("arxiv")
+
+import aux_scientific
+from aux_scientific import collection_dir, create_collection, delete_collection, DEFAULT_COLLECTION
+
+
+@pytest.fixture
+def collections_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(aux_scientific, "COLLECTIONS_DIR", tmp_path / "collections")
+    monkeypatch.setattr(aux_scientific, "STORAGE_DIR", tmp_path / "storage")
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", ["papers", "ml-2024", "A_b-9", "x" * 64])
+def test_valid_collection_names(collections_root, name):
+    assert collection_dir(name) == collections_root / "collections" / name
+
+
+@pytest.mark.parametrize("name", ["", "../etc", "a/b", ".hidden", "-lead", "_lead", "white space", "x" * 65, "naïve", "papers\n"])
+def test_invalid_collection_names(collections_root, name):
+    with pytest.raises(ValueError):
+        collection_dir(name)
+
+
+def test_default_collection_keeps_storage_dir(collections_root):
+    assert collection_dir(DEFAULT_COLLECTION) == collections_root / "storage"
+    with pytest.raises(ValueError):
+        delete_collection(DEFAULT_COLLECTION)
+
+
+def test_create_and_delete_collection(collections_root):
+    create_collection("papers")
+    with pytest.raises(FileExistsError):
+        create_collection("papers")
+    delete_collection("papers")
+    with pytest.raises(FileNotFoundError):
+        delete_collection("papers")
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("crewai_tools")
+
+
+@pytest.fixture
+def crewai_module(backend_dir, monkeypatch):
+    # Imported first so its stores are created outside the source tree
+    import aux_finance  # noqa: F401
+    # aux_crewai reads config/*.yaml relative to the working directory
+    monkeypatch.chdir(backend_dir)
+    for key in ("OPENAI_API_KEY", "SERPER_API_KEY", "GROQ_API_KEY"):
+        monkeypatch.setenv(key, "test")
+    import aux_crewai
+    return aux_crewai
+
+
+def test_every_template_builds_and_copies(crewai_module):
+    registry = crewai_module.CrewRegistry()
+    for pipeline in crewai_module.CREW_PIPELINES:
+        options = (1, 2) if pipeline in crewai_module.GROQ_PIPELINES else (1,)
+        for option in options:
+            template = registry.template(pipeline, option)
+            crew = registry.get(pipeline, option)
+            assert crew is not template
+            assert len(crew.tasks) == len(crewai_module.CREW_PIPELINES[pipeline])
+            roles = {agent.role for agent in crew.agents}
+            assert all(task.agent.role in roles for task in crew.tasks)
+
+
+def test_groq_crews_search_with_the_groq_agent(crewai_module):
+    registry = crewai_module.CrewRegistry()
+    for pipeline in crewai_module.GROQ_PIPELINES:
+        crew = registry.get(pipeline, 2)
+        assert crew.tasks[0].agent.role == crewai_module.web_search_agent_groq.role
@@ -0,0 +1,82 @@
+import numpy as np
+
+from aux_embeddings import EmbeddingCache, HashEmbedding, CachedEmbedding, text_hash
+
+embedded_batches = []
+
+
+class CountingEmbedding(HashEmbedding):
+    """HashEmbedding that records every batch it is asked to embed"""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CountingEmbedding"
+
+    def _get_text_embeddings(self, texts) -> list:
+        embedded_batches.append(list(texts))
+        return super()._get_text_embeddings(texts)
+
+
+def test_hash_embedding_is_deterministic_and_normalized():
+    model = HashEmbedding(model_name="hash", dim=64)
+    a = np.array(model.get_text_embedding("sparse attention"))
+    assert np.allclose(a, model.get_text_embedding("sparse attention"))
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert not np.allclose(a, model.get_text_embedding("dense retrieval"))
+
+
+def test_embedding_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    keys = [text_hash("a"), text_hash("b")]
+    cache.put_many(keys, [[1.0, 0.0], [0.0, 1.0]])
+    cache.put_many(keys[:1], [[9.0, 9.0]])  # existing keys are not rewritten
+    assert cache.get_many(keys + ["missing"]) == {keys[0]: [1.0, 0.0], keys[1]: [0.0, 1.0]}
+    reopened = EmbeddingCache(tmp_path)
+    assert len(reopened) == 2
+    assert reopened.get_many(keys[1:]) == {keys[1]: [0.0, 1.0]}
+
+
+def test_embedding_cache_drops_torn_rows(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    # Simulate a crash halfway through writing the second row's vector
+    vectors = tmp_path / "vectors.f32"
+    vectors.write_bytes(vectors.read_bytes()[:12])
+    reopened = EmbeddingCache(tmp_path)
+    assert len(reopened) == 1
+    reopened.put_many(["c"], [[5.0, 6.0]])
+    assert EmbeddingCache(tmp_path).get_many(["a", "c"]) == {"a": [1.0, 2.0], "c": [5.0, 6.0]}
+
+
+def test_cached_embedding_only_embeds_misses(tmp_path):
+    embedded_batches.clear()
+    model = CachedEmbedding(CountingEmbedding(model_name="count", dim=32),
+                            cache_dir=tmp_path, batch_size=2, concurrency=2)
+    texts = ["one", "two", "one", "three"]
+    first = model.get_text_embedding_batch(texts)
+    assert sorted(text for batch in embedded_batches for text in batch) == ["one", "three", "two"]
+    assert all(len(batch) <= 2 for batch in embedded_batches)
+
+    embedded_batches.clear()
+    assert model.get_text_embedding_batch(texts) == first
+    assert embedded_batches == []
+
+    # A new wrapper over the same directory reuses the persisted vectors
+    again = CachedEmbedding(CountingEmbedding(model_name="count", dim=32), cache_dir=tmp_path)
+    assert np.allclose(again.get_text_embedding("two"), first[1])
+    assert embedded_batches == []
+
+
+def test_cache_directory_is_per_model(tmp_path):
+    CachedEmbedding(HashEmbedding(model_name="hash-a", dim=8), cache_dir=tmp_path).get_text_embedding("x")
+    CachedEmbedding(HashEmbedding(model_name="hash-b", dim=16), cache_dir=tmp_path).get_text_embedding("x")
+    assert len([path for path in tmp_path.iterdir() if path.is_dir()]) == 2
+
+
+def test_batches_stay_under_the_token_budget(tmp_path):
+    embedded_batches.clear()
+    model = CachedEmbedding(CountingEmbedding(model_name="count", dim=32),
+                            cache_dir=tmp_path, batch_size=100, batch_tokens=50)
+    texts = [f"paper {i} " + "word " * 20 for i in range(6)]
+    model.get_text_embedding_batch(texts)
+    assert [len(batch) for batch in embedded_batches] == [2, 2, 2]
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from aux_indicators import sma, ema, rsi, rolling_std, compute_indicators, lttb_indices, to_columnar
+
+
+def ohlcv(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    index = pd.bdate_range('2020-01-01', periods=n)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000.0}, index=index)
+
+
+def test_sma_matches_pandas_rolling():
+    x = np.arange(10, dtype=np.float64)
+    expected = pd.Series(x).rolling(3).mean().to_numpy()
+    np.testing.assert_allclose(sma(x, 3), expected, equal_nan=True)
+    assert np.isnan(sma(x[:2], 3)).all()
+
+
+def test_ema_seeds_with_sma():
+    x = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    out = ema(x, 3)
+    assert np.isnan(out[:2]).all()
+    assert out[2] == 2.0
+    assert out[3] == 2.0 + 0.5 * (4.0 - 2.0)
+
+
+def test_ema_matches_recurrence_after_leading_nans():
+    x = np.concatenate([[np.nan] * 4, np.linspace(10, 30, 50) + np.sin(np.arange(50))])
+    n, alpha = 5, 2 / 6
+    expected = np.full(len(x), np.nan)
+    value = x[4:9].mean()
+    expected[8] = value
+    for i in range(9, len(x)):
+        value += alpha * (x[i] - value)
+        expected[i] = value
+    np.testing.assert_allclose(ema(x, n), expected, equal_nan=True)
+
+
+def test_rolling_std_is_population_std():
+    x = np.array([1.0, 2.0, 4.0, 8.0])
+    np.testing.assert_allclose(rolling_std(x, 2)[1:], [0.5, 1.0, 2.0])
+
+
+def test_rsi_bounds():
+    rising = np.arange(1, 40, dtype=np.float64)
+    assert rsi(rising, 14)[-1] == 100.0
+    values = rsi(ohlcv()['Close'].to_numpy(), 14)
+    valid = values[~np.isnan(values)]
+    assert ((valid >= 0) & (valid <= 100)).all()
+
+
+def test_compute_indicators_aligned_with_frame():
+    df = ohlcv()
+    columns = compute_indicators(df)
+    assert all(len(values) == len(df) for values in columns.values())
+    np.testing.assert_allclose(columns['macd_hist'], columns['macd'] - columns['macd_signal'], equal_nan=True)
+    assert np.isnan(columns['sma_200'][198]) and not np.isnan(columns['sma_200'][199])
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[2500] = 10.0
+    keep = lttb_indices(y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert (np.diff(keep) > 0).all()
+    assert 2500 in keep
+
+
+def test_lttb_short_series_untouched():
+    np.testing.assert_array_equal(lttb_indices(np.arange(10.0), 50), np.arange(10))
+    np.testing.assert_array_equal(lttb_indices(np.arange(10.0), 2), np.arange(10))
+
+
+def test_to_columnar_uses_null_for_nan():
+    df = ohlcv(30)
+    out = to_columnar(df, compute_indicators(df))
+    assert len(out['index']) == 30
+    assert out['columns']['sma_50'][0] is None
+    assert out['columns']['close'][0] == round(float(df['Close'].iloc[0]), 4)
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+
+from aux_jobs import InMemoryJobStore, JobManager, SQLiteJobStore
+from aux_workers import CrewWorkerPool, PoolSaturatedError
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteJobStore(tmp_path / 'jobs.db')
+    return InMemoryJobStore()
+
+
+def make_pool():
+    return CrewWorkerPool(max_workers=1, max_queue=1, endpoint_limits={}, endpoint_queue=1)
+
+
+async def wait_for(manager, job_id, status):
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job and job['status'] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {manager.get(job_id)}")
+
+
+def test_submit_runs_tasks_in_order(store):
+    def work(progress):
+        progress('research')
+        progress('write')
+        return "done"
+
+    async def scenario():
+        manager = JobManager(store, pool=make_pool())
+        job = manager.submit('blog', 'blog', ['research', 'write'], {'topic': 'x'}, work)
+        assert job['status'] == 'queued'
+        finished = await wait_for(manager, job['id'], 'succeeded')
+        assert finished['result'] == "done"
+        assert [task['status'] for task in finished['tasks']] == ['done', 'done']
+        assert finished['duration'] is not None and finished['expires_at'] is not None
+
+    asyncio.run(scenario())
+
+
+def test_failed_work_is_recorded(store):
+    def work(progress):
+        progress('research')
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        manager = JobManager(store, pool=make_pool())
+        job = manager.submit('blog', 'blog', ['research', 'write'], {}, work)
+        finished = await wait_for(manager, job['id'], 'failed')
+        assert finished['error'] == "model unavailable"
+        assert [task['status'] for task in finished['tasks']] == ['done', 'failed']
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_expire(store):
+    async def scenario():
+        manager = JobManager(store, pool=make_pool(), ttl=0)
+        job = manager.submit('blog', 'blog', [], {}, lambda progress: "done")
+        await asyncio.sleep(0.1)
+        assert manager.get(job['id']) is None
+        assert store.get(job['id']) is None
+
+    asyncio.run(scenario())
+
+
+def test_full_pool_rejects_without_saving(store):
+    async def scenario():
+        pool = make_pool()
+        manager = JobManager(store, pool=pool)
+        release = threading.Event()
+        manager.submit('blog', 'blog', [], {}, lambda progress: release.wait())
+        manager.submit('blog', 'blog', [], {}, lambda progress: "done")
+        with pytest.raises(PoolSaturatedError):
+            manager.submit('blog', 'blog', [], {}, lambda progress: "done")
+        assert len(store.all()) == 2
+        release.set()
+
+    asyncio.run(scenario())
+
+
+def test_store_errors_release_the_reservation(store):
+    class Broken(Exception):
+        pass
+
+    def fail(*args, **kwargs):
+        raise Broken()
+
+    async def scenario():
+        pool = make_pool()
+        manager = JobManager(store, pool=pool)
+        for method in ('purge_expired', 'save'):
+            original = getattr(store, method)
+            setattr(store, method, fail)
+            with pytest.raises(Broken):
+                manager.submit('blog', 'blog', [], {}, lambda progress: "done")
+            setattr(store, method, original)
+            assert pool._pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_recover_fails_unfinished_jobs(tmp_path):
+    path = tmp_path / 'jobs.db'
+    before = SQLiteJobStore(path)
+    for job_id, status in (('a', 'queued'), ('b', 'running'), ('c', 'succeeded')):
+        before.save({'id': job_id, 'status': status, 'tasks': [], 'started_at': None, 'expires_at': None})
+
+    manager = JobManager(SQLiteJobStore(path), pool=make_pool())
+    manager.recover()
+    statuses = {job['id']: (job['status'], job.get('error')) for job in manager.store.all()}
+    assert statuses['a'] == ('failed', "Interrupted by server restart")
+    assert statuses['b'][0] == 'failed'
+    assert statuses['c'] == ('succeeded', None)
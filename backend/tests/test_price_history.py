@@ -0,0 +1,129 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aux_finance
+from aux_finance import PriceHistoryStore, period_start
+
+
+def bars(start, periods=None, end=None):
+    index = pd.bdate_range(start, end, periods=periods, name='Date')
+    close = np.linspace(100, 110, len(index))
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000.0}, index=index)
+
+
+class FakeTicker:
+    calls = []
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, **kwargs):
+        FakeTicker.calls.append(kwargs)
+        if 'period' in kwargs:
+            start = period_start(kwargs['period']) or date(2015, 1, 1)
+            return bars(start, end=pd.Timestamp.today().normalize())
+        return bars(kwargs['start'], 3)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    FakeTicker.calls = []
+    monkeypatch.setattr(aux_finance.yf, "Ticker", FakeTicker)
+    return PriceHistoryStore(tmp_path / "prices.db", freshness=3600)
+
+
+def test_period_start():
+    today = date(2024, 6, 15)
+    assert period_start('max', today) is None
+    assert period_start('ytd', today) == date(2024, 1, 1)
+    assert period_start('1mo', today) == date(2024, 5, 15)
+
+
+def test_needs_full_download_follows_coverage():
+    needs = PriceHistoryStore._needs_full_download
+    start = date(2024, 1, 1)
+    assert needs(None, start)
+    assert not needs({'start': None, 'full': True, 'fetched_at': 0}, None)
+    assert not needs({'start': '2023-06-01', 'full': False, 'fetched_at': 0}, start)
+    assert needs({'start': '2024-03-01', 'full': False, 'fetched_at': 0}, start)
+    assert needs({'start': '2024-03-01', 'full': False, 'fetched_at': 0}, None)
+
+
+def test_store_keeps_earliest_coverage_start(store):
+    store.store('aapl', bars('2024-03-01', 5), start=date(2024, 3, 1))
+    store.store('AAPL', bars('2024-01-01', 5), start=date(2024, 1, 1))
+    store.store('AAPL', bars('2024-03-08', 2))
+    assert store._coverage('AAPL')['start'] == '2024-01-01'
+    store.store('AAPL', bars('2024-03-11', 1), full=True)
+    assert store._coverage('AAPL')['full'] and store._coverage('AAPL')['start'] is None
+
+
+def test_empty_download_records_no_coverage(store):
+    store.store('AAPL', bars('2024-03-01', 5), start=date(2024, 3, 1))
+    before = store._coverage('AAPL')
+    store.store('AAPL', bars('2024-03-01', 0), start=date(2019, 3, 1))
+    store.store('AAPL', None, full=True)
+    assert store._coverage('AAPL') == before
+
+
+def test_coverage_only_reaches_back_to_the_first_bar(store):
+    store.store('NEW', bars('2023-06-01', 5), start=date(2019, 1, 1))
+    assert store._coverage('NEW')['start'] == '2023-06-01'
+    store.store('OLD', bars('2019-01-02', 5), start=date(2019, 1, 1))
+    assert store._coverage('OLD')['start'] == '2019-01-01'
+
+
+def test_history_downloads_once_then_only_new_bars(store, monkeypatch):
+    first = store.history('aapl', '1y')
+    assert first.index[0].date() >= period_start('1y')
+    assert FakeTicker.calls == [{'period': '1y'}]
+
+    # Within the freshness window nothing is fetched
+    store.history('AAPL', '6mo')
+    assert len(FakeTicker.calls) == 1
+
+    # Once stale, only bars from the last stored date are requested
+    monkeypatch.setattr(aux_finance.time, "time", lambda: 1e12)
+    store.history('AAPL', '6mo')
+    assert FakeTicker.calls[-1] == {'start': first.index[-1].date().isoformat()}
+
+    # A longer period than covered needs a full download again
+    store.history('AAPL', 'max')
+    assert FakeTicker.calls[-1] == {'period': 'max'}
+
+
+def test_new_dividend_reloads_the_covered_range(store, monkeypatch):
+    store.history('AAPL', '1y')
+    covered = store._coverage('AAPL')['start']
+    stored = len(store.load('AAPL'))
+
+    def with_dividend(self, **kwargs):
+        FakeTicker.calls.append(kwargs)
+        if kwargs.get('start') == covered:
+            return bars(covered, end=pd.Timestamp.today().normalize()) * 0.5
+        df = bars(kwargs['start'], 3)
+        df['Dividends'] = [0.0, 0.0, 0.5]
+        return df
+
+    monkeypatch.setattr(FakeTicker, "history", with_dividend)
+    monkeypatch.setattr(aux_finance.time, "time", lambda: 1e12)
+    store.history('AAPL', '1y')
+    assert FakeTicker.calls[-1] == {'start': covered}
+    assert len(store.load('AAPL')) == stored
+    assert store.load('AAPL')['Close'].iloc[0] == 50.0
+
+
+def test_history_many_skips_tickers_missing_from_bulk_result(store, monkeypatch):
+    def download(tickers, **kwargs):
+        frame = bars(period_start('1y'), end=pd.Timestamp.today().normalize())
+        return pd.concat({'AAPL': frame}, axis=1)
+
+    monkeypatch.setattr(aux_finance.yf, "download", download)
+    frames = store.history_many(['aapl', 'gone'], '1y')
+    assert len(frames['AAPL']) > 0 and frames['GONE'].empty
+    assert store._coverage('AAPL') is not None
+    assert store._coverage('GONE') is None
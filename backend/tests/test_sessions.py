@@ -0,0 +1,55 @@
+import pytest
+
+from aux_sessions import ChatSessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("aux_sessions.time.time", lambda: now[0])
+    return now
+
+
+def test_new_sessions_get_server_ids(clock):
+    store = ChatSessionStore(ttl=60, max_sessions=10)
+    session = store.get_or_create(None, list)
+    assert store.get_or_create(session.session_id, list) is session
+    other = store.get_or_create("client-chosen", list)
+    assert other.session_id != "client-chosen"
+    assert len(store) == 2
+
+
+def test_idle_sessions_expire(clock):
+    store = ChatSessionStore(ttl=60, max_sessions=10)
+    session = store.get_or_create(None, list)
+    clock[0] += 30
+    assert store.get_or_create(session.session_id, list) is session
+    clock[0] += 61
+    replacement = store.get_or_create(session.session_id, list)
+    assert replacement is not session
+    assert len(store) == 1
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    store = ChatSessionStore(ttl=600, max_sessions=2)
+    first = store.get_or_create(None, list)
+    second = store.get_or_create(None, list)
+    clock[0] += 1
+    store.get_or_create(first.session_id, list)
+    store.get_or_create(None, list)
+    assert len(store) == 2
+    assert store.get_or_create(first.session_id, list) is first
+    assert not store.delete(second.session_id)
+
+
+def test_drop_engines_keeps_current_generation(clock):
+    store = ChatSessionStore(ttl=600, max_sessions=10)
+    old, current, elsewhere = (store.get_or_create(None, list) for _ in range(3))
+    old.engine, old.engine_key = object(), ("papers", 1, "hybrid")
+    current.engine, current.engine_key = object(), ("papers", 2, "hybrid")
+    elsewhere.engine, elsewhere.engine_key = object(), ("other", 1, "hybrid")
+    store.drop_engines("papers", keep_generation=2)
+    assert old.engine is None and old.engine_key is None
+    assert current.engine is not None
+    store.drop_engines("other")
+    assert elsewhere.engine is None
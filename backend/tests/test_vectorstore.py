@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode, NodeRelationship, RelatedNodeInfo
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from aux_vectorstore import MmapVectorStore, VECTOR_IDS_FILE
+
+DTYPES = ["float32", "float16", "int8"]
+
+
+def node(node_id, ref_doc_id, vector):
+    return TextNode(id_=node_id, text=node_id, embedding=list(vector),
+                    relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=ref_doc_id)})
+
+
+def sample_nodes(dim=16, count=40, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dim))
+    return [node(f"n{i}", f"doc{i % 4}", vectors[i]) for i in range(count)], vectors
+
+
+def top_ids(store, vector, k=5, node_ids=None):
+    result = store.query(VectorStoreQuery(query_embedding=list(vector), similarity_top_k=k, node_ids=node_ids))
+    return result.ids
+
+
+def test_rejects_unknown_dtype():
+    with pytest.raises(ValueError):
+        MmapVectorStore(dtype="float64")
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_query_finds_exact_match_first(dtype):
+    nodes, vectors = sample_nodes()
+    store = MmapVectorStore(dtype=dtype)
+    store.add(nodes)
+    assert store.node_count == len(nodes)
+    for i in (0, 17, 39):
+        assert top_ids(store, vectors[i])[0] == f"n{i}"
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_query_restricted_to_node_ids(dtype):
+    nodes, vectors = sample_nodes()
+    store = MmapVectorStore(dtype=dtype)
+    store.add(nodes)
+    assert set(top_ids(store, vectors[0], k=3, node_ids=["n1", "n2", "missing"])) == {"n1", "n2"}
+    assert top_ids(store, vectors[0], node_ids=["missing"]) == []
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_delete_by_ref_doc_and_node(dtype):
+    nodes, vectors = sample_nodes()
+    store = MmapVectorStore(dtype=dtype)
+    store.add(nodes)
+    store.delete("doc0")
+    assert store.node_count == 30
+    assert all(int(node_id[1:]) % 4 != 0 for node_id in top_ids(store, vectors[0], k=40))
+    store.delete_nodes(["n1", "n2"])
+    assert store.node_count == 28
+    assert top_ids(store, vectors[3])[0] == "n3"
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_persist_and_memory_mapped_reload(dtype, tmp_path):
+    nodes, vectors = sample_nodes()
+    store = MmapVectorStore(dtype=dtype)
+    store.add(nodes)
+    store.delete("doc1")
+    store.persist(str(tmp_path / "vector_store.json"))
+
+    loaded = MmapVectorStore.from_persist_dir(tmp_path)
+    assert loaded.dtype == dtype
+    assert loaded.node_count == store.node_count
+    assert isinstance(loaded._matrix, np.memmap)
+    for i in (0, 2, 3):
+        assert top_ids(loaded, vectors[i]) == top_ids(store, vectors[i])
+
+    # Appending to a memory-mapped store works and persists again
+    extra, extra_vectors = sample_nodes(count=2, seed=1)
+    loaded.add([node("x0", "doc9", extra_vectors[0])])
+    loaded.persist(str(tmp_path / "vector_store.json"))
+    assert MmapVectorStore.from_persist_dir(tmp_path).node_count == store.node_count + 1
+
+
+def test_empty_store_persists(tmp_path):
+    store = MmapVectorStore()
+    store.persist(str(tmp_path / "vector_store.json"))
+    assert (tmp_path / VECTOR_IDS_FILE).exists()
+    assert MmapVectorStore.from_persist_dir(tmp_path).node_count == 0
+    assert top_ids(store, np.ones(4)) == []
+
+
+def test_dimension_mismatch_is_rejected():
+    store = MmapVectorStore()
+    store.add([node("a", "d", np.ones(4))])
+    with pytest.raises(ValueError):
+        store.add([node("b", "d", np.ones(8))])
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+
+from aux_workers import CrewWorkerPool, PoolSaturatedError
+
+
+def make_pool(**kwargs):
+    options = dict(max_workers=2, max_queue=2, endpoint_limits={'blog': 1}, endpoint_queue=1)
+    options.update(kwargs)
+    return CrewWorkerPool(**options)
+
+
+def test_endpoint_queue_full_is_429():
+    async def scenario():
+        pool = make_pool(max_queue=10)
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run('blog', release.wait))
+        await asyncio.sleep(0.05)
+        queued = pool.reserve('blog')
+        with pytest.raises(PoolSaturatedError) as error:
+            pool.reserve('blog')
+        assert error.value.status_code == 429
+        queued.release()
+        release.set()
+        await running
+
+    asyncio.run(scenario())
+
+
+def test_pool_full_is_503():
+    async def scenario():
+        pool = make_pool(max_workers=1, max_queue=1, endpoint_queue=10)
+        first = pool.reserve('blog')
+        second = pool.reserve('other')
+        with pytest.raises(PoolSaturatedError) as error:
+            pool.reserve('images')
+        assert error.value.status_code == 503
+        first.release()
+        second.release()
+        assert pool.stats()['pending'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_endpoint_limit_caps_concurrency():
+    async def scenario():
+        pool = make_pool(endpoint_limits={'blog': 2}, endpoint_queue=10, max_workers=4, max_queue=10)
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def work():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            threading.Event().wait(0.05)
+            with lock:
+                active[0] -= 1
+
+        await asyncio.gather(*[pool.run('blog', work) for _ in range(6)])
+        assert peak[0] == 2
+        assert pool.stats()['pending'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reservation_release_is_idempotent():
+    pool = make_pool()
+    reservation = pool.reserve('blog')
+    reservation.release()
+    reservation.release()
+    stats = pool.stats()
+    assert stats['pending'] == 0
+    assert stats['endpoints']['blog']['waiting'] == 0
+
+
+def test_cancelled_caller_keeps_slot_until_thread_returns():
+    async def scenario():
+        pool = make_pool()
+        release = threading.Event()
+        task = asyncio.ensure_future(pool.run('blog', release.wait))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert pool.stats()['endpoints']['blog']['running'] == 1
+        assert pool.stats()['pending'] == 1
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert pool.stats()['endpoints']['blog']['running'] == 0
+        assert pool.stats()['pending'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_run_with_released_reservation_is_cancelled():
+    async def scenario():
+        pool = make_pool()
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run('blog', release.wait))
+        await asyncio.sleep(0.05)
+        reservation = pool.reserve('blog')
+        queued = asyncio.ensure_future(pool.run('blog', lambda: "never", reservation=reservation))
+        await asyncio.sleep(0.05)
+        reservation.release()
+        release.set()
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        stats = pool.stats()
+        assert stats['pending'] == 0
+        assert stats['endpoints']['blog'] == {'limit': 1, 'running': 0, 'waiting': 0, 'queue_limit': 1}
+        assert await pool.run('blog', lambda: "ok") == "ok"
+
+    asyncio.run(scenario())
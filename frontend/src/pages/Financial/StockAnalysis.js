@@ -36,15 +36,9 @@ const StockAnalysis = () => {
 
   const fetchChart = async (symbol) => {
     try {
-      const response = await fetch('http://localhost:8000/api/generate-chart', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          ticker: symbol.trim().toUpperCase()
-        }),
-      });
+      // GET lets the browser revalidate a cached chart with its ETag (304 on repeat views)
+      const ticker = encodeURIComponent(symbol.trim().toUpperCase());
+      const response = await fetch(`http://localhost:8000/api/chart/${ticker}`);
       
       if (!response.ok) {
         throw new Error('Failed to generate chart');